@@ -1,12 +1,12 @@
 {
     "name": "Library Management",
-    "version": "19.0.1.0.0",
+    "version": "19.0.1.1.0",
     "summary": "Manage library books",
     "description": "Simple library management module to manage books",
     "category": "Education",
     "author": "Admin",
     "license": "LGPL-3",
-    "depends": ["base","contacts"],
+    "depends": ["base","contacts","mail"],
     "data": [
 
         "security/ir.model.access.csv",
@@ -15,9 +15,20 @@
         "views/library_category_views.xml",
         "wizards/force_stop_borrow_wizard_views.xml",
         "wizards/force_stop_borrow_action.xml",
+        "wizards/force_stop_borrow_bulk_wizard_views.xml",
+        "wizards/fine_settlement_wizard_views.xml",
+        "wizards/member_enrol_wizard_views.xml",
         "views/library_borrow_views.xml",
         "views/library_member_views.xml",
         "views/library_fine_views.xml",
+        "views/library_borrow_archive_views.xml",
+        "views/library_hold_views.xml",
+        "views/library_perf_sample_views.xml",
+        "views/library_book_import_views.xml",
+        "views/library_borrow_close_job_views.xml",
+        "report/library_circulation_report_views.xml",
+        "data/library_cron.xml",
+        "data/mail_template_data.xml",
 
         "views/library_menus.xml",
     ],
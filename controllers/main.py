@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+
+from werkzeug.exceptions import BadRequest
+
+from odoo import http
+from odoo.exceptions import UserError
+from odoo.http import content_disposition, request
+from odoo.tools import SQL
+
+# Upper bound of scans accepted in one request
+MAX_SCANS = 500
+# Rows fetched per round trip of the export cursor
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_MODELS = {
+    "books": "library.book",
+    "borrows": "library.borrow",
+    "fines": "library.fine",
+}
+EXPORT_FILTERS = ("date_from", "date_to", "status", "category_id", "include_archive")
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+# Runs query through a server-side cursor and yields the encoded rows chunk
+# by chunk. It runs after the request cursor is closed, so it reads with a
+# cursor of its own
+def _stream_rows(registry, columns, query, file_format):
+    with registry.cursor() as cr:
+        cr.execute(SQL("DECLARE library_export NO SCROLL CURSOR FOR %s", query))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if file_format == "csv":
+            writer.writerow(columns)
+            yield buffer.getvalue().encode()
+        while True:
+            cr.execute(SQL("FETCH FORWARD %s FROM library_export", EXPORT_CHUNK_SIZE))
+            rows = cr.fetchall()
+            if not rows:
+                break
+            buffer.seek(0)
+            buffer.truncate()
+            if file_format == "csv":
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, row)), default=str))
+                    buffer.write("\n")
+            yield buffer.getvalue().encode()
+
+
+class LibraryCirculation(http.Controller):
+
+    # Checkout/return endpoint for barcode scanners. Takes a batch of scans
+    # ({"book_code", "member", "action"}) and answers with one compact result
+    # per scan, in order
+    @http.route("/library/circulation/scan", type="jsonrpc", auth="user", methods=["POST"])
+    def scan(self, scans):
+        if not isinstance(scans, list) or not scans or len(scans) > MAX_SCANS:
+            raise UserError("Send between 1 and %s scans per request." % MAX_SCANS)
+        return {"results": request.env["library.borrow"]._process_scans(scans)}
+
+    # Streaming export of books, borrows or fines as CSV or JSON Lines, e.g.
+    # /library/export/borrows?file_format=jsonl&date_from=2024-01-01&status=returned.
+    # Borrows and fines include the archived history (include_archive=0 to
+    # leave it out).
+    # Rows are sent while the query is read, so memory stays flat whatever
+    # the size of the result
+    @http.route("/library/export/<string:kind>", type="http", auth="user", methods=["GET"])
+    def export(self, kind, file_format="csv", **filters):
+        if kind not in EXPORT_MODELS or file_format not in EXPORT_CONTENT_TYPES:
+            raise request.not_found()
+        Model = request.env[EXPORT_MODELS[kind]]
+        Model.check_access("read")
+        try:
+            columns, query = Model._export_query({key: filters.get(key) for key in EXPORT_FILTERS})
+        except ValueError:
+            raise BadRequest("Invalid export filter.")
+
+        return request.make_response(
+            _stream_rows(request.env.registry, columns, query, file_format),
+            headers=[
+                ("Content-Type", EXPORT_CONTENT_TYPES[file_format]),
+                ("Content-Disposition", content_disposition("%s.%s" % (kind, file_format))),
+                ("X-Accel-Buffering", "no"),
+            ],
+        )
@@ -0,0 +1,15 @@
+def migrate(cr, version):
+    # Books existing before the copy counter get one copy, minus the active loan
+    cr.execute("""
+        UPDATE library_book b
+           SET available_copies = GREATEST(b.copies - COALESCE(l.on_loan, 0), 0),
+               available = b.copies - COALESCE(l.on_loan, 0) > 0
+          FROM library_book b2
+     LEFT JOIN (
+                SELECT book_id, count(*) AS on_loan
+                  FROM library_borrow
+                 WHERE status = 'borrowed' AND active
+              GROUP BY book_id
+               ) l ON l.book_id = b2.id
+         WHERE b.id = b2.id
+    """)
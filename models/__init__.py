@@ -1,3 +1,11 @@
+from . import perf
 from . import books
 from . import member
 from . import fine
+from . import borrow_archive
+from . import borrow_close_job
+from . import hold
+from . import mail_mail
+from . import stream_mixin
+from . import book_import
+from . import book_recommendation
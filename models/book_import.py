@@ -0,0 +1,166 @@
+import logging
+from itertools import groupby, islice
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class LibraryBookImport(models.Model):
+    _name = "library.book.import"
+    _inherit = ["library.stream.mixin"]
+    _description = "Library Book Catalog Import"
+    _order = "id desc"
+
+    name = fields.Char(string="Name", required=True)
+    data_file = fields.Binary(string="File", attachment=True, required=True)
+    file_format = fields.Selection(
+        [
+            ("csv", "CSV"),
+            ("jsonl", "JSON Lines"),
+        ],
+        string="Format",
+        default="csv",
+        required=True,
+    )
+    chunk_size = fields.Integer(string="Chunk Size", default=1000, required=True)
+    rows_done = fields.Integer(string="Imported Rows", readonly=True, copy=False)
+    state = fields.Selection(
+        [
+            ("draft", "Draft"),
+            ("queued", "Queued"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        string="Status",
+        default="draft",
+        readonly=True,
+        copy=False,
+    )
+    error = fields.Text(string="Error", readonly=True, copy=False)
+
+    _check_chunk_size = models.Constraint(
+        "CHECK(chunk_size > 0)",
+        "Chunk size must be positive.",
+    )
+
+    #Queues the import for the background cron. A failed import resumes
+    #after the last committed chunk; there is no reset, the books of the
+    #committed chunks already exist and would be created twice
+    def action_queue(self):
+        self.write({"state": "queued", "error": False})
+        self.env.ref("library_management.ir_cron_library_book_import")._trigger()
+
+    @api.model
+    def _cron_run_imports(self):
+        for job in self.search([("state", "in", ("queued", "running"))], order="id"):
+            job._run()
+
+    # Streams the file and creates books chunk by chunk, committing after each
+    # chunk together with rows_done so a crash resumes where it stopped.
+    # Authors and categories are resolved through a cache filled in bulk, and
+    # the ORM cache is cleared per chunk to keep memory flat
+    def _run(self):
+        self.ensure_one()
+        self.write({"state": "running", "error": False})
+        self.env.cr.commit()
+
+        Book = self.env["library.book"]
+        cache = {"author": {}, "category": {}}
+        try:
+            with self._open_binary_stream("data_file") as stream:
+                rows = islice(self._iter_file_rows(stream, self.file_format), self.rows_done, None)
+                while True:
+                    chunk = list(islice(rows, self.chunk_size))
+                    if not chunk:
+                        break
+                    Book.create(self._prepare_book_vals(chunk, cache))
+                    self.rows_done += len(chunk)
+                    self.env.cr.commit()
+                    self.env.invalidate_all()
+                    _logger.info("Book import %s: %s rows imported", self.name, self.rows_done)
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.exception("Book import %s failed", self.name)
+            self.write({"state": "failed", "error": str(e)})
+            self.env.cr.commit()
+            return
+
+        self.state = "done"
+        self.env.cr.commit()
+
+    # Row keys: name, author, categories (list, or ";"-separated in CSV, each
+    # a full path such as "Science / Physics"), publish_date, price, pages, copies
+    def _prepare_book_vals(self, rows, cache):
+        authors = self._resolve("res.partner", cache["author"], {
+            (row.get("author") or "").strip() for row in rows
+        })
+        categories = self._resolve_categories(cache["category"], {
+            path for row in rows for path in self._split_categories(row.get("categories"))
+        })
+
+        vals_list = []
+        for row in rows:
+            if not row.get("name"):
+                raise UserError("Row %s has no book name." % (self.rows_done + len(vals_list) + 1))
+            author = (row.get("author") or "").strip()
+            vals_list.append({
+                "name": row["name"].strip(),
+                "author_id": authors.get(author, False),
+                "category_id": [
+                    fields.Command.set([categories[name] for name in self._split_categories(row.get("categories"))])
+                ],
+                "publish_date": row.get("publish_date") or False,
+                "price": float(row.get("price") or 0.0),
+                "pages": int(row.get("pages") or 0),
+                "copies": int(row.get("copies") or 1),
+            })
+        return vals_list
+
+    @staticmethod
+    def _split_categories(value):
+        if not value:
+            return []
+        if isinstance(value, str):
+            value = value.split(";")
+        paths = (" / ".join(part.strip() for part in path.split("/") if part.strip()) for path in value)
+        return [path for path in paths if path]
+
+    # Maps names to ids for model, looking up the names missing from cache
+    # with one search and creating the unknown ones with one create
+    def _resolve(self, model, cache, names):
+        missing = {name for name in names if name and name not in cache}
+        if missing:
+            Model = self.env[model]
+            for rec in Model.search_fetch([("name", "in", list(missing))], ["name"]):
+                cache.setdefault(rec.name, rec.id)
+            to_create = [name for name in missing if name not in cache]
+            for rec in Model.create([{"name": name} for name in to_create]):
+                cache[rec.name] = rec.id
+        return cache
+
+    # Maps category paths to ids on complete_name, so "Science / Physics" and
+    # "Chemistry / Physics" stay apart. Missing categories are created with
+    # their missing parents, one create per level
+    def _resolve_categories(self, cache, paths):
+        missing = set()
+        for path in paths:
+            parts = path.split(" / ")
+            missing.update(" / ".join(parts[:depth]) for depth in range(1, len(parts) + 1))
+        missing -= cache.keys()
+        if missing:
+            Category = self.env["library.category"]
+            for category in Category.search_fetch([("complete_name", "in", list(missing))], ["complete_name"]):
+                cache.setdefault(category.complete_name, category.id)
+            to_create = sorted((path for path in missing if path not in cache), key=lambda path: path.count(" / "))
+            for _depth, level in groupby(to_create, key=lambda path: path.count(" / ")):
+                level = list(level)
+                vals_list = []
+                for path in level:
+                    parent, _sep, name = path.rpartition(" / ")
+                    vals_list.append({"name": name, "parent_id": cache.get(parent, False)})
+                for path, category in zip(level, Category.create(vals_list)):
+                    cache[path] = category.id
+        return cache
@@ -0,0 +1,219 @@
+import logging
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+from .books import RECENT_HISTORY_LIMIT
+
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:
+    numpy = sparse = None
+
+_logger = logging.getLogger(__name__)
+
+# Neighbours kept per book, books rebuilt per committed chunk and rows read
+# per fetch when loading the borrow history into the matrix
+RECOMMENDATION_TOP_K = 10
+RECOMMENDATION_CHUNK_SIZE = 2000
+HISTORY_FETCH_SIZE = 100000
+# Id of the last borrow taken into account, read by the incremental job
+LAST_BORROW_PARAM = "library_management.recommendation_last_borrow_id"
+
+# Every (member, book) pair ever borrowed, archived history included
+HISTORY_QUERY = SQL(
+    """
+    SELECT member_id, book_id FROM library_borrow
+     UNION ALL
+    SELECT member_id, book_id FROM library_borrow_archive
+    """
+)
+
+
+class LibraryBookRecommendation(models.Model):
+    _name = "library.book.recommendation"
+    _description = "Library Co-borrowing Recommendation"
+    _order = "book_id, rank"
+    _log_access = False
+
+    book_id = fields.Many2one("library.book", string="Book", required=True, readonly=True, ondelete="cascade")
+    related_book_id = fields.Many2one(
+        "library.book", string="Also Borrowed", required=True, readonly=True, ondelete="cascade"
+    )
+    # Number of members who borrowed both books
+    score = fields.Integer(string="Members", readonly=True)
+    rank = fields.Integer(string="Rank", readonly=True)
+
+    # Serves the book form and the member suggestions with one index scan
+    _book_rank_uniq = models.UniqueIndex("(book_id, rank)")
+
+    # Suggestions for a member: neighbours of the books of their latest loans
+    # they never borrowed, ranked by summed score
+    @api.model
+    def _suggest_for_member(self, member_id):
+        if not member_id:
+            return self.env["library.book"]
+        self.env.cr.execute(SQL(
+            """
+            SELECT r.related_book_id
+              FROM library_book_recommendation r
+             WHERE r.book_id IN (
+                    SELECT book_id FROM library_borrow WHERE member_id = %s
+                  ORDER BY borrow_date DESC, id DESC
+                     LIMIT %s
+                   )
+               AND NOT EXISTS (
+                    SELECT 1 FROM library_borrow b
+                     WHERE b.member_id = %s AND b.book_id = r.related_book_id
+                   )
+          GROUP BY r.related_book_id
+          ORDER BY sum(r.score) DESC, r.related_book_id
+             LIMIT %s
+            """,
+            member_id, RECENT_HISTORY_LIMIT, member_id, RECOMMENDATION_TOP_K,
+        ))
+        return self.env["library.book"].browse([row[0] for row in self.env.cr.fetchall()])
+
+    # Weekly job: recomputes the neighbours of every book
+    @api.model
+    def _cron_rebuild(self):
+        self.env.cr.execute(SQL("SELECT max(id) FROM library_borrow"))
+        last_id = self.env.cr.fetchone()[0] or 0
+        self.env.cr.execute(SQL("SELECT id FROM library_book ORDER BY id"))
+        self._rebuild([row[0] for row in self.env.cr.fetchall()])
+        self.env["ir.config_parameter"].sudo().set_param(LAST_BORROW_PARAM, last_id)
+
+    # Hourly job: a new borrow of a book by a member changes the pairs of that
+    # book with every other book of the member, so only the books of members
+    # who borrowed since the last run are recomputed
+    @api.model
+    def _cron_update(self):
+        params = self.env["ir.config_parameter"].sudo()
+        since = int(params.get_param(LAST_BORROW_PARAM, 0))
+        if not since:
+            return self._cron_rebuild()
+
+        self.env.cr.execute(SQL("SELECT max(id) FROM library_borrow"))
+        last_id = self.env.cr.fetchone()[0] or 0
+        if last_id <= since:
+            return
+        self.env.cr.execute(SQL(
+            """
+            SELECT DISTINCT h.book_id FROM (%s) h
+             WHERE h.member_id IN (
+                    SELECT member_id FROM library_borrow WHERE id > %s AND id <= %s
+                   )
+            """,
+            HISTORY_QUERY, since, last_id,
+        ))
+        self._rebuild([row[0] for row in self.env.cr.fetchall()], partial=True)
+        params.set_param(LAST_BORROW_PARAM, last_id)
+
+    # Replaces the neighbours of book_ids chunk by chunk, committing each
+    # chunk so readers always see a complete list per book. With NumPy and
+    # SciPy the co-occurrence counts come from sparse products, otherwise
+    # PostgreSQL computes them with a self-join
+    def _rebuild(self, book_ids, partial=False):
+        self.env.flush_all()
+        matrix = None
+        if numpy is not None and book_ids:
+            matrix = self._load_history_matrix(book_ids if partial else None)
+
+        for start in range(0, len(book_ids), RECOMMENDATION_CHUNK_SIZE):
+            chunk = book_ids[start:start + RECOMMENDATION_CHUNK_SIZE]
+            self.env.cr.execute(SQL(
+                "DELETE FROM library_book_recommendation WHERE book_id = ANY(%s)", chunk,
+            ))
+            if matrix is not None:
+                self._insert_top_k(chunk, matrix)
+            else:
+                self._insert_top_k_sql(chunk)
+            self.env.cr.commit()
+        self.env.invalidate_all()
+        _logger.info("Book recommendations rebuilt for %s books", len(book_ids))
+
+    # Members x books incidence matrix (CSR, 1 when the member borrowed the
+    # book), restricted to the members who borrowed one of book_ids. Rows
+    # are streamed from a server-side cursor into int32 arrays
+    def _load_history_matrix(self, book_ids=None):
+        cr = self.env.cr
+        query = HISTORY_QUERY
+        if book_ids is not None:
+            query = SQL(
+                """
+                SELECT h.member_id, h.book_id FROM (%s) h
+                 WHERE h.member_id IN (SELECT s.member_id FROM (%s) s WHERE s.book_id = ANY(%s))
+                """,
+                HISTORY_QUERY, HISTORY_QUERY, book_ids,
+            )
+        cr.execute(SQL("DECLARE library_history NO SCROLL CURSOR FOR %s", query))
+        parts = []
+        while True:
+            cr.execute(SQL("FETCH FORWARD %s FROM library_history", HISTORY_FETCH_SIZE))
+            rows = cr.fetchall()
+            if not rows:
+                break
+            parts.append(numpy.array(rows, dtype=numpy.int32))
+        cr.execute(SQL("CLOSE library_history"))
+
+        cr.execute(SQL("SELECT coalesce(max(id), 0) FROM library_book"))
+        book_count = cr.fetchone()[0] + 1
+        pairs = numpy.concatenate(parts) if parts else numpy.zeros((0, 2), dtype=numpy.int32)
+        member_count = int(pairs[:, 0].max()) + 1 if len(pairs) else 1
+        matrix = sparse.csr_matrix(
+            (numpy.ones(len(pairs), dtype=numpy.int32), (pairs[:, 0], pairs[:, 1])),
+            shape=(member_count, book_count),
+        )
+        # Repeated loans of a book by the same member count once
+        matrix.data[:] = 1
+        return matrix
+
+    def _insert_top_k(self, book_ids, matrix):
+        columns = numpy.array(book_ids, dtype=numpy.int32)
+        # books of the chunk x all books, value = members who borrowed both
+        cooccurrence = (matrix[:, columns].T @ matrix).tocsr()
+        rows = ([], [], [], [])
+        for i, book_id in enumerate(book_ids):
+            start, end = cooccurrence.indptr[i], cooccurrence.indptr[i + 1]
+            related = cooccurrence.indices[start:end]
+            scores = cooccurrence.data[start:end]
+            keep = related != book_id
+            related, scores = related[keep], scores[keep]
+            if len(scores) > RECOMMENDATION_TOP_K:
+                top = numpy.argpartition(-scores, RECOMMENDATION_TOP_K)[:RECOMMENDATION_TOP_K]
+                related, scores = related[top], scores[top]
+            order = numpy.lexsort((related, -scores))
+            rows[0].extend([book_id] * len(order))
+            rows[1].extend(related[order].tolist())
+            rows[2].extend(scores[order].tolist())
+            rows[3].extend(range(1, len(order) + 1))
+        if rows[0]:
+            self.env.cr.execute(SQL(
+                """
+                INSERT INTO library_book_recommendation (book_id, related_book_id, score, rank)
+                SELECT * FROM unnest(%s::int[], %s::int[], %s::int[], %s::int[])
+                """,
+                *rows,
+            ))
+
+    def _insert_top_k_sql(self, book_ids):
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO library_book_recommendation (book_id, related_book_id, score, rank)
+            SELECT book_id, related_book_id, score, rank FROM (
+                SELECT a.book_id, b.book_id AS related_book_id,
+                       count(DISTINCT a.member_id) AS score,
+                       row_number() OVER (
+                           PARTITION BY a.book_id
+                           ORDER BY count(DISTINCT a.member_id) DESC, b.book_id
+                       ) AS rank
+                  FROM (%s) a
+                  JOIN (%s) b ON b.member_id = a.member_id AND b.book_id <> a.book_id
+                 WHERE a.book_id = ANY(%s)
+              GROUP BY a.book_id, b.book_id
+            ) ranked
+             WHERE rank <= %s
+            """,
+            HISTORY_QUERY, HISTORY_QUERY, book_ids, RECOMMENDATION_TOP_K,
+        ))
@@ -1,45 +1,376 @@
 from odoo import models, fields, api
-from odoo.exceptions import ValidationError
+from odoo.fields import Domain
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import LRU, SQL
+import psycopg2
+import psycopg2.errorcodes
+from collections import Counter
 from datetime import timedelta
 
+from .perf import instrument
+
+# Default fine policy: Rs.10/day after 14 days of borrowed date. Can be
+# overridden with the library_management.loan_days and
+# library_management.fine_per_day system parameters
+ALLOWED_DAYS = 14
+FINE_PER_DAY = 10
+OVERDUE_CHUNK_SIZE = 10000
+# Borrows shown in the history tab of the book and member forms
+RECENT_HISTORY_LIMIT = 20
+# Overdue reminders: rendered and queued per chunk, sent at most
+# library_management.reminder_rate per minute, repeated every
+# library_management.reminder_interval_days while the loan stays overdue
+REMINDER_CHUNK_SIZE = 1000
+REMINDER_RATE = 60
+REMINDER_INTERVAL_DAYS = 7
+
+# (dbname, book_code) -> book id, shared by the circulation requests of a
+# worker. Book codes are readonly and never reused, so entries stay valid
+_BOOK_CODE_CACHE = LRU(65536)
+
+
+# Filters shared by the streaming exports: date_from/date_to on date_field and
+# category_id, matched with its subcategories, on category_field. Raises
+# ValueError on malformed values
+def export_domain(filters, date_field, category_field):
+    domain = Domain.TRUE
+    if filters.get("date_from"):
+        domain &= Domain(date_field, ">=", fields.Date.to_date(filters["date_from"]))
+    if filters.get("date_to"):
+        domain &= Domain(date_field, "<=", fields.Date.to_date(filters["date_to"]))
+    if filters.get("category_id"):
+        domain &= Domain(category_field, "child_of", int(filters["category_id"]))
+    return domain
+
+
+# Appends the archived rows to a streaming export query: the archive first,
+# then the live rows, each in id order so no global sort delays the first
+# rows. archive_query returns None when the filters exclude the archive
+def export_with_archive(query, filters, archive_query):
+    if str(filters.get("include_archive") or "1").lower() in ("0", "false"):
+        return query
+    archived = archive_query(filters)
+    if archived is None:
+        return query
+    return SQL("(%s) UNION ALL (%s)", archived, query)
+
 
 class LibBooks(models.Model):
     _name = "library.book"
     _description = "Library Book"
+    _rec_names_search = ["name", "book_code", "author_name"]
 
     # Basic fields
-    name = fields.Char(string="Book Name", required=True)
+    name = fields.Char(string="Book Name", required=True, index="trigram")
     publish_date = fields.Date(string="Publish Date")
-    available = fields.Boolean(string="Available",default=True)
+    available = fields.Boolean(string="Available", compute="_compute_available", store=True)
     price = fields.Float(string="Price")
     pages = fields.Integer(string="Pages")
     active = fields.Boolean(default=True)
 
+    # Inventory. available_copies is the live counter, only changed through
+    # _checkout_copies/_release_copies so concurrent checkouts cannot oversubscribe
+    copies = fields.Integer(string="Copies", default=1)
+    available_copies = fields.Integer(string="Available Copies", readonly=True, copy=False)
+
     author_id = fields.Many2one("res.partner", string="Author")
+    author_name = fields.Char(related="author_id.name", string="Author Name", store=True, index="trigram")
     category_id = fields.Many2many("library.category", string="Category")
     borrow_ids = fields.One2many(
         "library.borrow", "book_id", string="Borrow History"
     )
+    # Most recent borrows only, read with one indexed LIMIT query so opening
+    # the form does not depend on the length of the history
+    recent_borrow_ids = fields.Many2many(
+        "library.borrow", string="Recent Borrows", compute="_compute_recent_borrow_ids"
+    )
+    # "Members who borrowed this also borrowed", precomputed by the
+    # recommendation jobs and read with one indexed query
+    recommended_book_ids = fields.Many2many(
+        "library.book", string="Also Borrowed", compute="_compute_recommended_book_ids"
+    )
 
-    # Smart button
+    # Smart button. Stored so list views can sort/filter on it without
+    # loading borrow_ids
     borrow_count = fields.Integer(
-        string="Borrow Count", compute="_compute_borrow_count"
+        string="Borrow Count", compute="_compute_borrow_count", store=True
     )
+    # borrows moved to library.borrow.archive, kept up to date by the archival job
+    archived_borrow_count = fields.Integer(string="Archived Borrows", readonly=True, copy=False)
+
+    book_code=fields.Char(string="Book sequence",readonly=True,copy=False,default="New",index="trigram")
 
-    book_code=fields.Char(string="Book sequence",readonly=True,copy=False,default="New")
+    _check_copies = models.Constraint(
+        "CHECK(copies >= 0 AND available_copies >= 0 AND available_copies <= copies)",
+        "Available copies must be between 0 and the number of copies.",
+    )
 
     #This model will add the sequence number update we will create new data
-    @api.model
+    #codes for the whole batch are reserved in one statement
+    @api.model_create_multi
+    @instrument
     def create(self,vals_list):
+        to_number=[vals for vals in vals_list if vals.get("book_code","New")=="New"]
+        for vals,code in zip(to_number,self._allocate_book_codes(len(to_number))):
+            vals["book_code"]=code
         for vals in vals_list:
-            if vals.get("book_code","New")=="New":
-                vals["book_code"]=self.env["ir.sequence"].next_by_code("library.book") 
+            vals.setdefault("available_copies", vals.get("copies", 1))
         return super().create(vals_list)
 
+    # Reserves a contiguous block of count book codes from the library.book
+    # sequence with a single statement. Standard sequences use nextval() on
+    # the PostgreSQL sequence, so codes from parallel workers never collide
+    # (gaps are possible); no_gap sequences bump number_next once for the
+    # whole block. Date-range sequences fall back to next_by_code
+    @api.model
+    def _allocate_book_codes(self, count):
+        if count <= 1:
+            return [self.env["ir.sequence"].next_by_code("library.book") for _i in range(count)]
+
+        sequence = self.env["ir.sequence"].sudo().search(
+            [
+                ("code", "=", "library.book"),
+                ("company_id", "in", [self.env.company.id, False]),
+            ],
+            order="company_id",
+            limit=1,
+        )
+        if not sequence or sequence.use_date_range:
+            return [self.env["ir.sequence"].next_by_code("library.book") for _i in range(count)]
+
+        if sequence.implementation == "standard":
+            self.env.cr.execute(SQL(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                "ir_sequence_%03d" % sequence.id, count,
+            ))
+            numbers = sorted(row[0] for row in self.env.cr.fetchall())
+        else:
+            sequence.flush_recordset(["number_next"])
+            self.env.cr.execute(SQL(
+                """
+                UPDATE ir_sequence
+                   SET number_next = number_next + number_increment * %s
+                 WHERE id = %s
+             RETURNING number_next - number_increment * %s, number_increment
+                """,
+                count, sequence.id, count,
+            ))
+            first, step = self.env.cr.fetchone()
+            sequence.invalidate_recordset(["number_next"])
+            numbers = [first + step * i for i in range(count)]
+
+        return [sequence.get_next_char(number) for number in numbers]
+
+    #Changing the number of copies keeps the copies on loan unchanged.
+    #copies and the counters are set by one UPDATE, the CHECK constraint
+    #only ever sees the final row. Added copies are offered to the holds
+    @instrument
+    def write(self, vals):
+        if "copies" in vals and "available_copies" not in vals:
+            vals = dict(vals)
+            copies = vals.pop("copies") or 0
+            if self.ids:
+                self.flush_recordset(["copies", "available_copies", "available"])
+                self.env.cr.execute(SQL(
+                    """
+                    UPDATE library_book b
+                       SET copies = %s,
+                           available_copies = GREATEST(b.available_copies + %s - b.copies, 0),
+                           available = GREATEST(b.available_copies + %s - b.copies, 0) > 0,
+                           write_uid = %s,
+                           write_date = now() AT TIME ZONE 'UTC'
+                      FROM (
+                            SELECT id, available_copies AS previous
+                              FROM library_book
+                             WHERE id = ANY(%s)
+                          ORDER BY id
+                               FOR UPDATE
+                           ) old
+                     WHERE b.id = old.id
+                 RETURNING b.id, b.available_copies - old.previous
+                    """,
+                    copies, copies, copies, self.env.uid, self.ids,
+                ))
+                added = {book_id: qty for book_id, qty in self.env.cr.fetchall() if qty > 0}
+                self.invalidate_recordset(["copies", "available_copies", "available", "write_uid", "write_date"])
+                # new copies go to the hold queue first, like returned ones
+                if added:
+                    self.env["library.hold"]._allocate(added)
+            if not vals:
+                return True
+        return super().write(vals)
+
+    @api.depends("available_copies")
+    @instrument
+    def _compute_available(self):
+        for book in self:
+            book.available = book.available_copies > 0
+
+    # Takes copies for checkout. counts maps book id -> number of copies.
+    # Rows are locked in id order (no deadlocks between concurrent batches)
+    # and decremented with one conditional UPDATE, failing fast when a book
+    # has no copy left. A title being checked out by another transaction is
+    # not waited for: NOWAIT (or a serialization failure when the other one
+    # already committed) becomes a "busy" error, so a hot title never piles
+    # up blocked workers or rounds of transaction retries
+    @api.model
+    @instrument
+    def _checkout_copies(self, counts):
+        if not counts:
+            return
+        book_ids = sorted(counts)
+        self.flush_model(["copies", "available_copies", "available"])
+        try:
+            self.env.cr.execute(SQL(
+                "SELECT id FROM library_book WHERE id = ANY(%s) ORDER BY id FOR UPDATE NOWAIT",
+                book_ids,
+            ), log_exceptions=False)
+        except psycopg2.Error as e:
+            if e.pgcode not in (psycopg2.errorcodes.LOCK_NOT_AVAILABLE, psycopg2.errorcodes.SERIALIZATION_FAILURE):
+                raise
+            raise UserError("This book is being checked out at another desk, please try again.")
+        self.env.cr.execute(SQL(
+            """
+            UPDATE library_book b
+               SET available_copies = b.available_copies - c.qty,
+                   available = b.available_copies - c.qty > 0
+              FROM unnest(%s::int[], %s::int[]) AS c(id, qty)
+             WHERE b.id = c.id
+               AND b.available_copies >= c.qty
+         RETURNING b.id
+            """,
+            book_ids, [counts[book_id] for book_id in book_ids],
+        ))
+        taken = {row[0] for row in self.env.cr.fetchall()}
+        self.invalidate_model(["available_copies", "available"])
+
+        if len(taken) < len(book_ids):
+            missing = self.browse([book_id for book_id in book_ids if book_id not in taken])
+            raise ValidationError(
+                "This book is currently not available: %s" % ", ".join(missing.mapped("name"))
+            )
+
+    # Gives copies back on return, never above the number of copies. Returned
+    # copies go to the head of the hold queue first
+    @api.model
+    @instrument
+    def _release_copies(self, counts):
+        if not counts:
+            return
+        book_ids = sorted(counts)
+        self.flush_model(["copies", "available_copies", "available"])
+        self.env.cr.execute(SQL(
+            """
+            UPDATE library_book b
+               SET available_copies = LEAST(b.copies, b.available_copies + c.qty),
+                   available = LEAST(b.copies, b.available_copies + c.qty) > 0
+              FROM unnest(%s::int[], %s::int[]) AS c(id, qty)
+             WHERE b.id = c.id
+            """,
+            book_ids, [counts[book_id] for book_id in book_ids],
+        ))
+        self.invalidate_model(["available_copies", "available"])
+        self.env["library.hold"]._allocate(counts)
+
+    # Book dropdowns search name, code and author through the trigram indexes
+    # and rank the matches: exact code first, then by name similarity
+    @api.model
+    @instrument
+    def name_search(self, name="", domain=None, operator="ilike", limit=100):
+        if not name or operator != "ilike" or not self.env.registry.has_trigram:
+            return super().name_search(name, domain, operator, limit)
+
+        search_domain = Domain(domain or []) & (
+            Domain("name", "ilike", name)
+            | Domain("book_code", "ilike", name)
+            | Domain("author_name", "ilike", name)
+        )
+        query = self._search(search_domain, limit=limit)
+        query.order = SQL(
+            "upper(%s) = upper(%s) DESC, similarity(%s, %s) DESC, %s",
+            SQL.identifier(self._table, "book_code"), name,
+            SQL.identifier(self._table, "name"), name,
+            SQL.identifier(self._table, "id"),
+        )
+        return [(book.id, book.display_name) for book in self.browse(query).sudo()]
+
+    # Streaming export: column names and the query of the books matching the
+    # filters (status is "available" or "unavailable"). Record rules apply
+    # through _search
+    @api.model
+    def _export_query(self, filters):
+        domain = export_domain(filters, "publish_date", "category_id")
+        if filters.get("status"):
+            domain &= Domain("available", "=", filters["status"] == "available")
+        query = self._search(domain)
+        columns = [
+            "book_code", "name", "author", "categories", "copies",
+            "available_copies", "publish_date", "price", "pages",
+        ]
+        return columns, SQL(
+            """
+            SELECT b.book_code, b.name, b.author_name,
+                   (SELECT string_agg(c.complete_name, '; ' ORDER BY c.complete_name)
+                      FROM library_book_library_category_rel rel
+                      JOIN library_category c ON c.id = rel.library_category_id
+                     WHERE rel.library_book_id = b.id),
+                   b.copies, b.available_copies, b.publish_date, b.price, b.pages
+              FROM library_book b
+             WHERE b.id IN %s
+          ORDER BY b.id
+            """,
+            query.subselect(),
+        )
+
+    # Maps book codes to ids through the in-process cache, looking up the
+    # codes missing from it with one query. Unknown codes are left out
+    @api.model
+    def _get_ids_by_code(self, codes):
+        dbname = self.env.cr.dbname
+        result = {}
+        missing = []
+        for code in codes:
+            book_id = _BOOK_CODE_CACHE.get((dbname, code))
+            if book_id:
+                result[code] = book_id
+            elif code:
+                missing.append(code)
+
+        if missing:
+            for book in self.search_fetch([("book_code", "in", missing)], ["book_code"]):
+                _BOOK_CODE_CACHE[(dbname, book.book_code)] = book.id
+                result[book.book_code] = book.id
+        return result
+
     #This compute method shows the no. of book borrowed
+    #counted with one read_group for the whole recordset
+    @api.depends("borrow_ids", "borrow_ids.active")
+    @instrument
     def _compute_borrow_count(self):
+        counts = dict(self.env["library.borrow"]._read_group(
+            [("book_id", "in", self.ids)],
+            groupby=["book_id"],
+            aggregates=["__count"],
+        ))
         for book in self:
-            book.borrow_count = len(book.borrow_ids)
+            book.borrow_count = counts.get(book._origin, 0)
+
+    def _compute_recent_borrow_ids(self):
+        Borrow = self.env["library.borrow"]
+        for book in self:
+            book.recent_borrow_ids = Borrow.search(
+                [("book_id", "=", book._origin.id)], limit=RECENT_HISTORY_LIMIT
+            ) if book._origin else Borrow
+
+    def _compute_recommended_book_ids(self):
+        related = {}
+        recommendations = self.env["library.book.recommendation"].search_fetch(
+            [("book_id", "in", self._origin.ids)], ["book_id", "related_book_id"]
+        )
+        for recommendation in recommendations:
+            related.setdefault(recommendation.book_id.id, []).append(recommendation.related_book_id.id)
+        for book in self:
+            book.recommended_book_ids = self.browse(related.get(book._origin.id, []))
 
     #Action method written for smart button which shows borrow history
     def action_open_borrow_history(self):
@@ -53,21 +384,94 @@ class LibBooks(models.Model):
             "context": {"default_book_id": self.id},
         }
 
+    #Smart button action for the borrows moved to cold storage
+    def action_open_archived_history(self):
+        self.ensure_one()
+        return {
+            "name": "Archived Borrow History",
+            "type": "ir.actions.act_window",
+            "res_model": "library.borrow.archive",
+            "view_mode": "list",
+            "domain": [("book_id", "=", self.id)],
+        }
+
 class LibraryCategory(models.Model):
     _name = "library.category"
     _description = "Library Category"
+    _parent_name = "parent_id"
+    _parent_store = True
+    _rec_name = "complete_name"
+    _order = "complete_name"
 
     name = fields.Char(required=True)
+    complete_name = fields.Char(
+        string="Complete Name", compute="_compute_complete_name", recursive=True, store=True
+    )
+    parent_id = fields.Many2one("library.category", string="Parent Category", index=True, ondelete="cascade")
+    child_ids = fields.One2many("library.category", "parent_id", string="Child Categories")
+    # child_of domains resolve with one prefix match on this column
+    parent_path = fields.Char(index=True)
+
+    book_ids = fields.Many2many(
+        "library.book", "library_book_library_category_rel", "library_category_id", "library_book_id",
+        string="Books",
+    )
+    # Distinct books in the category and all its subcategories
+    book_count = fields.Integer(
+        string="Books", compute="_compute_book_count", recursive=True, store=True
+    )
+
+    @api.depends("name", "parent_id.complete_name")
+    def _compute_complete_name(self):
+        for category in self:
+            if category.parent_id:
+                category.complete_name = "%s / %s" % (category.parent_id.complete_name, category.name)
+            else:
+                category.complete_name = category.name
+
+    # One query for the whole recordset, matching subtrees on parent_path
+    @api.depends("book_ids", "parent_id", "child_ids.book_count")
+    @instrument
+    def _compute_book_count(self):
+        categories = self.filtered("id")
+        counts = {}
+        if categories:
+            self.env["library.book"].flush_model(["category_id"])
+            self.flush_model(["parent_path"])
+            self.env.cr.execute(SQL(
+                """
+                SELECT c.id, count(DISTINCT rel.library_book_id)
+                  FROM library_category c
+                  JOIN library_category sub ON sub.parent_path LIKE c.parent_path || '%%'
+                  JOIN library_book_library_category_rel rel ON rel.library_category_id = sub.id
+                 WHERE c.id = ANY(%s)
+              GROUP BY c.id
+                """,
+                categories.ids,
+            ))
+            counts = dict(self.env.cr.fetchall())
+        for category in self:
+            category.book_count = counts.get(category.id, 0)
+
+    @api.constrains("parent_id")
+    def _check_category_recursion(self):
+        if self._has_cycle():
+            raise ValidationError("You cannot create recursive categories.")
 
 
 class LibraryBorrow(models.Model):
     _name = "library.borrow"
     _description = "Library Borrow Records"
+    _order = "borrow_date desc, id desc"
 
     member_id = fields.Many2one("library.member", string="Member", required=True)
     book_id = fields.Many2one("library.book", string="Book", required=True)
     borrow_date = fields.Date(string="Borrow Date", default=fields.Date.today)
     return_date = fields.Date(string="Return Date")
+    due_date = fields.Date(string="Due Date", compute="_compute_due_date", store=True)
+    accrued_fine = fields.Float(string="Accrued Fine", readonly=True, copy=False)
+    reminder_date = fields.Date(string="Last Reminder", readonly=True, copy=False)
+    member_has_unpaid_fines = fields.Boolean(related="member_id.has_unpaid_fines", string="Member Has Unpaid Fines")
     active = fields.Boolean(default=True)
 
     status = fields.Selection(
@@ -77,65 +481,391 @@ class LibraryBorrow(models.Model):
         ],
         default="borrowed",
         string="Status",
+        index=True,
     )
 
-    #This method will update available to false if some user has borrowed the book
-    #this will update the db
-    @api.model
-    def create(self,vals):
-        record=super().create(vals)
+    # Per book/member history in _order, also used for plain book_id/member_id lookups
+    _book_history_idx = models.Index("(book_id, borrow_date DESC, id DESC)")
+    _member_history_idx = models.Index("(member_id, borrow_date DESC, id DESC)")
+
+    # Open loans by due date, backs the overdue filter and the accrual cron
+    _open_due_date_idx = models.Index("(due_date, id) WHERE status = 'borrowed' AND active")
+
+    # Same member cannot borrow same book twice. Enforced by PostgreSQL so it
+    # costs nothing per row and holds under concurrent workers
+    _unique_active_loan = models.UniqueIndex(
+        "(book_id, member_id) WHERE status = 'borrowed' AND active",
+        "You have already borrowed this book.",
+    )
+
+    #This method will take a copy of the book if some user has borrowed it
+    #this will update the db. Whole batch is handled at once, so the copies of
+    #all new borrows are taken with a single locked update
+    @api.model_create_multi
+    @instrument
+    def create(self,vals_list):
+        records=super().create(vals_list)
 
-        if record.status=="borrowed" and record.book_id:
-            record.book_id.write({"available":False})
-        return record
+        records.filtered(lambda r:r.status=="borrowed")._checkout()
+        return records
 
     #this is method which updates the database when borrowed book is returned
+    #and calculates fines per day after the due date
+    @instrument
     def write(self,vals):
+        to_return=self.env["library.borrow"]
+        to_checkout=self.env["library.borrow"]
+        if vals.get("status")=="returned":
+            to_return=self.filtered(lambda r:r.status=="borrowed")
+        elif vals.get("status")=="borrowed":
+            to_checkout=self.filtered(lambda r:r.status=="returned")
+
         result=super().write(vals)
 
-        if vals.get("status")=="returned":
-            for rec in self:
-                if rec.book_id:
-                    rec.book_id.available=True
+        to_return._process_returns()
+        to_checkout._checkout()
         return result
 
-    # this function calculates fines Rs.10/day after 14 days of borrowed date
-    # Renders only in UI. No db-level changes
-
-    def write(self, vals):
-        res = super().write(vals)
+    #Gives the copies of active borrows back when they are deleted
+    @instrument
+    def unlink(self):
+        counts=Counter(rec.book_id.id for rec in self if rec.status=="borrowed" and rec.book_id)
+        result=super().unlink()
+        self.env["library.book"]._release_copies(counts)
+        return result
 
+    @api.model
+    def _get_fine_policy(self):
+        params = self.env["ir.config_parameter"].sudo()
+        return (
+            int(params.get_param("library_management.loan_days", ALLOWED_DAYS)),
+            float(params.get_param("library_management.fine_per_day", FINE_PER_DAY)),
+        )
+
+    @api.depends("borrow_date")
+    def _compute_due_date(self):
+        loan_days = self._get_fine_policy()[0]
         for rec in self:
-            # Check only when book is returned
-            if vals.get("status") == "returned" and rec.return_date and rec.borrow_date:
-                allowed_days = 14
-                fine_per_day = 10
-
-                due_date = rec.borrow_date + timedelta(days=allowed_days)
-
-                if rec.return_date > due_date:
-                    late_days = (rec.return_date - due_date).days
-                    fine_amount = late_days * fine_per_day
-
-                    # Avoid duplicate unpaid fine
-                    existing_fine = self.env["library.fine"].search([
-                        ("borrow_id", "=", rec.id),
-                        ("status", "=", "unpaid")
-                    ], limit=1)
+            rec.due_date = rec.borrow_date and rec.borrow_date + timedelta(days=loan_days)
 
-                    if not existing_fine:
-                        self.env["library.fine"].create({
-                            "member_id": rec.member_id.id,
-                            "borrow_id": rec.id,
-                            "amount": fine_amount,
-                            "status": "unpaid",
-                        })
-
-        return res
+    # Nightly job: refreshes accrued_fine on every open overdue loan. Loans are
+    # walked by id in fixed-size chunks with one UPDATE each, committing
+    # between chunks so no giant transaction or long lock is held
+    @api.model
+    def _cron_accrue_overdue_fines(self, chunk_size=OVERDUE_CHUNK_SIZE):
+        fine_per_day = self._get_fine_policy()[1]
+        today = fields.Date.context_today(self)
+        self.flush_model(["due_date", "status", "active", "accrued_fine"])
+
+        last_id = 0
+        while True:
+            self.env.cr.execute(SQL(
+                """
+                UPDATE library_borrow b
+                   SET accrued_fine = (%s::date - b.due_date) * %s
+                  FROM (
+                        SELECT id FROM library_borrow
+                         WHERE status = 'borrowed' AND active
+                           AND due_date < %s AND id > %s
+                      ORDER BY id
+                         LIMIT %s
+                       ) chunk
+                 WHERE b.id = chunk.id
+             RETURNING b.id
+                """,
+                today, fine_per_day, today, last_id, chunk_size,
+            ))
+            ids = [row[0] for row in self.env.cr.fetchall()]
+            if not ids:
+                break
+            last_id = max(ids)
+            self.env.cr.commit()
+        self.invalidate_model(["accrued_fine"])
+
+    # Processes a batch of circulation scans. Each scan is a dict with
+    # book_code, member (email or phone) and an optional action: "checkout",
+    # "return" or "auto" (return when the member holds the book, checkout
+    # otherwise). Lookups, returns and checkouts are each done once for the
+    # whole batch; returns one result dict per scan
+    @api.model
+    @instrument
+    def _process_scans(self, scans):
+        # malformed entries (not an object, code or member not a string) get
+        # an error result and are left out of the lookups
+        scans = [
+            scan if isinstance(scan, dict)
+            and isinstance(scan.get("book_code"), str)
+            and isinstance(scan.get("member"), str) else None
+            for scan in scans
+        ]
+        valid = [scan for scan in scans if scan]
+        book_ids = self.env["library.book"]._get_ids_by_code({scan["book_code"] for scan in valid})
+
+        idents = {scan["member"] for scan in valid if scan["member"]}
+        member_ids = self.env["library.member"]._find_members(idents)
+
+        results = []
+        pairs = {}
+        for scan in scans:
+            if scan is None:
+                results.append({"book_code": None, "status": "error", "error": "Invalid scan"})
+                continue
+            result = {"book_code": scan.get("book_code")}
+            results.append(result)
+            book_id = book_ids.get(scan.get("book_code"))
+            member_id = member_ids.get(scan["member"].lower()) or member_ids.get(scan["member"])
+            if not book_id:
+                result.update(status="error", error="Unknown book code")
+            elif not member_id:
+                result.update(status="error", error="Unknown member")
+            else:
+                pairs[len(results) - 1] = (book_id, member_id)
+
+        open_loans = {
+            (loan.book_id.id, loan.member_id.id): loan.id
+            for loan in self.search_fetch(
+                [
+                    ("book_id", "in", [pair[0] for pair in pairs.values()]),
+                    ("member_id", "in", [pair[1] for pair in pairs.values()]),
+                    ("status", "=", "borrowed"),
+                ],
+                ["book_id", "member_id"],
+            )
+        }
 
+        to_return = {}
+        to_checkout = {}
+        for index, pair in pairs.items():
+            action = scans[index].get("action") or "auto"
+            if action == "auto":
+                action = "return" if pair in open_loans else "checkout"
+
+            if action == "return" and pair in open_loans and open_loans[pair] not in to_return.values():
+                to_return[index] = open_loans[pair]
+            elif action == "checkout" and pair not in open_loans and pair not in to_checkout.values():
+                to_checkout[index] = pair
+            elif action in ("checkout", "return"):
+                error = "Book is not borrowed by this member" if action == "return" else "You have already borrowed this book."
+                results[index].update(status="error", error=error)
+            else:
+                results[index].update(status="error", error="Unknown action")
+
+        if to_return:
+            self.browse(list(to_return.values())).write({
+                "status": "returned",
+                "return_date": fields.Date.context_today(self),
+            })
+            for index, borrow_id in to_return.items():
+                results[index].update(status="returned", borrow_id=borrow_id)
+
+        if to_checkout:
+            self._checkout_scans(to_checkout, results)
+        return results
+
+    # Creates the borrows of a scan batch in one create. If the batch fails
+    # (e.g. a book has no copy left), scans are retried one by one so only the
+    # offending ones are reported
+    def _checkout_scans(self, to_checkout, results):
+        def vals(pair):
+            return {"book_id": pair[0], "member_id": pair[1]}
+
+        try:
+            with self.env.cr.savepoint():
+                borrows = self.create([vals(pair) for pair in to_checkout.values()])
+        except (UserError, psycopg2.Error):
+            borrows = None
+
+        if borrows is not None:
+            for index, borrow in zip(to_checkout, borrows):
+                results[index].update(status="checked_out", borrow_id=borrow.id)
+            return
+
+        for index, pair in to_checkout.items():
+            try:
+                with self.env.cr.savepoint():
+                    borrow = self.create(vals(pair))
+                results[index].update(status="checked_out", borrow_id=borrow.id)
+            except (UserError, psycopg2.Error) as e:
+                if isinstance(e, UserError):
+                    message = e.args[0]
+                elif e.pgcode == psycopg2.errorcodes.UNIQUE_VIOLATION:
+                    message = "You have already borrowed this book."
+                else:
+                    message = "Checkout failed"
+                results[index].update(status="error", error=message)
+
+    # Streaming export of the loans, archived ones included, filtered on
+    # borrow_date, status and the book category. Loans moved to
+    # library.borrow.archive follow unless include_archive is "0"; the
+    # archived column tells them apart
+    @api.model
+    def _export_query(self, filters):
+        domain = export_domain(filters, "borrow_date", "book_id.category_id")
+        if filters.get("status"):
+            domain &= Domain("status", "=", filters["status"])
+        query = self.with_context(active_test=False)._search(domain)
+        columns = [
+            "id", "book_code", "book", "member", "email", "borrow_date",
+            "due_date", "return_date", "status", "accrued_fine", "archived",
+        ]
+        live = SQL(
+            """
+            SELECT b.id, bk.book_code, bk.name, m.name, m.email, b.borrow_date,
+                   b.due_date, b.return_date, b.status, b.accrued_fine, FALSE
+              FROM library_borrow b
+              JOIN library_book bk ON bk.id = b.book_id
+              JOIN library_member m ON m.id = b.member_id
+             WHERE b.id IN %s
+          ORDER BY b.id
+            """,
+            query.subselect(),
+        )
+        return columns, export_with_archive(
+            live, filters, self.env["library.borrow.archive"]._export_borrows_query,
+        )
+
+    # Queues overdue reminders. Overdue loans are found with one indexed query
+    # per chunk, rendered from the template in batch and queued as mail.mail
+    # records whose scheduled dates are spread to respect the rate limit; the
+    # regular mail queue then sends them. Each chunk is committed, so the
+    # borrow rows are only locked by one short UPDATE at a time
+    @api.model
+    def _cron_queue_overdue_reminders(self, chunk_size=REMINDER_CHUNK_SIZE):
+        params = self.env["ir.config_parameter"].sudo()
+        rate = max(int(params.get_param("library_management.reminder_rate", REMINDER_RATE)), 1)
+        interval = int(params.get_param("library_management.reminder_interval_days", REMINDER_INTERVAL_DAYS))
+        template = self.env.ref("library_management.mail_template_overdue_reminder")
+        Mail = self.env["mail.mail"].sudo()
+        today = fields.Date.context_today(self)
+        self.env.flush_all()
+
+        self.env.cr.execute(SQL(
+            "SELECT max(scheduled_date) FROM mail_mail WHERE library_reminder AND state = 'outgoing'"
+        ))
+        next_slot = max(self.env.cr.fetchone()[0] or fields.Datetime.now(), fields.Datetime.now())
+        queued = 0
+
+        last_id = 0
+        while True:
+            self.env.cr.execute(SQL(
+                """
+                SELECT id FROM library_borrow
+                 WHERE status = 'borrowed' AND active
+                   AND due_date < %s AND id > %s
+                   AND (reminder_date IS NULL OR reminder_date <= %s)
+              ORDER BY id
+                 LIMIT %s
+                """,
+                today, last_id, today - timedelta(days=interval), chunk_size,
+            ))
+            ids = [row[0] for row in self.env.cr.fetchall()]
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            subjects = template._render_field("subject", ids)
+            bodies = template._render_field("body_html", ids)
+            recipients = template._render_field("email_to", ids)
+            senders = template._render_field("email_from", ids)
+            vals_list = []
+            for borrow_id in ids:
+                if not recipients[borrow_id]:
+                    continue
+                vals_list.append({
+                    "subject": subjects[borrow_id],
+                    "body_html": bodies[borrow_id],
+                    "email_to": recipients[borrow_id],
+                    "email_from": senders[borrow_id] or False,
+                    "model": self._name,
+                    "res_id": borrow_id,
+                    "auto_delete": True,
+                    "library_reminder": True,
+                    "scheduled_date": next_slot + timedelta(minutes=queued // rate),
+                })
+                queued += 1
+            Mail.create(vals_list)
+
+            self.env.cr.execute(SQL(
+                "UPDATE library_borrow SET reminder_date = %s WHERE id = ANY(%s)",
+                today, ids,
+            ))
+            self.env.cr.commit()
+            self.env.invalidate_all()
+
+    # Takes a copy for each borrow, except for members picking up a ready
+    # hold: their copy was already kept aside when it was allocated
+    @instrument
+    def _checkout(self):
+        pairs = {(rec.book_id.id, rec.member_id.id) for rec in self if rec.book_id}
+        held = self.env["library.hold"]._fulfill(pairs)
+        counts = Counter(
+            rec.book_id.id for rec in self
+            if rec.book_id and (rec.book_id.id, rec.member_id.id) not in held
+        )
+        self.env["library.book"]._checkout_copies(counts)
+
+    # Restores availability and creates late fines for the whole recordset.
+    # Query count does not depend on the number of returned borrows
+    @instrument
+    def _process_returns(self):
+        returned = self.filtered(lambda r: r.status == "returned")
+        if not returned:
+            return
+
+        self.env["library.book"]._release_copies(
+            Counter(rec.book_id.id for rec in returned if rec.book_id)
+        )
+
+        fine_per_day = self._get_fine_policy()[1]
+        late_fines = {}
+        for rec in returned:
+            if not rec.return_date or not rec.due_date:
+                continue
+            if rec.return_date > rec.due_date:
+                late_days = (rec.return_date - rec.due_date).days
+                late_fines[rec] = late_days * fine_per_day
+
+        # accrued_fine stops moving at return: it now shows the final fine
+        self.flush_recordset(["accrued_fine"])
+        self.env.cr.execute(SQL(
+            """
+            UPDATE library_borrow b
+               SET accrued_fine = c.amount
+              FROM unnest(%s::int[], %s::float8[]) AS c(id, amount)
+             WHERE b.id = c.id
+            """,
+            returned.ids, [late_fines.get(rec, 0.0) for rec in returned],
+        ))
+        returned.invalidate_recordset(["accrued_fine"])
+
+        if not late_fines:
+            return
+
+        # Avoid duplicate unpaid fine
+        Fine = self.env["library.fine"]
+        fined = Fine._read_group(
+            [
+                ("borrow_id", "in", [rec.id for rec in late_fines]),
+                ("status", "=", "unpaid"),
+            ],
+            groupby=["borrow_id"],
+        )
+        fined_ids = {borrow.id for borrow, in fined}
+
+        Fine.create([
+            {
+                "member_id": rec.member_id.id,
+                "borrow_id": rec.id,
+                "amount": amount,
+                "status": "unpaid",
+            }
+            for rec, amount in late_fines.items()
+            if rec.id not in fined_ids
+        ])
 
     # Return date validation
     @api.constrains("borrow_date", "return_date")
+    @instrument
     def _check_return_date(self):
         for rec in self:
             if rec.borrow_date and rec.return_date:
@@ -144,54 +874,49 @@ class LibraryBorrow(models.Model):
                         "Return date cannot be earlier than borrow date."
                     )
 
-    # Same member cannot borrow same book twice
-    @api.constrains("book_id", "member_id", "status")
-    def _check_same_user_same_book(self):
-        for rec in self:
-            if not rec.member_id or not rec.book_id:
-                continue
-
-            if rec.status == "borrowed":
-                domain = [
-                    ("book_id", "=", rec.book_id.id),
-                    ("member_id", "=", rec.member_id.id),
-                    ("status", "=", "borrowed"),
-                    ("id", "!=", rec.id),
-                ]
-                if self.search_count(domain) > 0:
-                    raise ValidationError(
-                        "You have already borrowed this book."
-                    )
-
     # Block borrowing if unpaid fine exists
+    # One indexed read of the stored member flag per batch. The member rows
+    # are share-locked so a concurrent fine payment or creation is either
+    # waited for or retried, never missed
     @api.constrains("member_id", "status")
+    @instrument
     def _check_unpaid_fines(self):
-        for rec in self:
-            if rec.status != "borrowed":
-                continue
-
-            unpaid_fine = self.env["library.fine"].search(
-                [
-                    ("member_id", "=", rec.member_id.id),
-                    ("status", "=", "unpaid"),
-                ],
-                limit=1,
+        members = self.filtered(lambda r: r.status == "borrowed").member_id
+        if not members:
+            return
+
+        members.flush_recordset(["has_unpaid_fines"])
+        self.env.cr.execute(SQL(
+            """
+            SELECT id FROM library_member
+             WHERE id = ANY(%s) AND has_unpaid_fines
+          ORDER BY id
+               FOR SHARE
+            """,
+            members.ids,
+        ))
+
+        if self.env.cr.fetchall():
+            raise ValidationError(
+                "This member has unpaid fines. Please clear them before borrowing another book."
             )
 
-            if unpaid_fine:
-                raise ValidationError(
-                    "This member has unpaid fines. Please clear them before borrowing another book."
-                )
-
     #shows popup if book is not available
     @api.onchange("book_id")
     def _onchange_book_id(self):
         if self.book_id and not self.book_id.available:
+            has_ready_hold = self.member_id and self.env["library.hold"].search_count([
+                ("book_id", "=", self.book_id.id),
+                ("member_id", "=", self.member_id.id),
+                ("state", "=", "ready"),
+            ], limit=1)
+            if has_ready_hold:
+                return
             self.book_id = False
             return {
                 "warning": {
                     "title": "Book not available",
-                    "message": "This book is currently not available"
+                    "message": "This book is currently not available, place a hold to join the queue"
                 }
             }
 
@@ -0,0 +1,159 @@
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.fields import Domain
+from odoo.tools import SQL
+
+from .books import export_domain
+
+_logger = logging.getLogger(__name__)
+
+# Returned borrows older than this many days are moved to the archive, can be
+# overridden with the library_management.archive_days system parameter
+ARCHIVE_DAYS = 730
+ARCHIVE_BATCH_SIZE = 5000
+
+
+class LibraryBorrowArchive(models.Model):
+    _name = "library.borrow.archive"
+    _description = "Archived Borrow Records"
+    _order = "borrow_date desc, id desc"
+    _log_access = False
+
+    original_id = fields.Integer(string="Borrow ID", readonly=True)
+    member_id = fields.Many2one("library.member", string="Member", readonly=True, ondelete="cascade")
+    book_id = fields.Many2one("library.book", string="Book", readonly=True, ondelete="cascade")
+    borrow_date = fields.Date(string="Borrow Date", readonly=True)
+    return_date = fields.Date(string="Return Date", readonly=True)
+    due_date = fields.Date(string="Due Date", readonly=True)
+    fine_amount = fields.Float(string="Fines Paid", readonly=True)
+
+    # History lookups from the book and member forms
+    _book_history_idx = models.Index("(book_id, borrow_date DESC)")
+    _member_history_idx = models.Index("(member_id, borrow_date DESC)")
+
+    # Moves returned borrows older than the horizon, with their paid fines,
+    # out of the hot tables. Each batch is a handful of set-based statements
+    # followed by a commit; borrows with an unpaid fine are kept
+    @api.model
+    def _cron_archive_history(self, batch_size=ARCHIVE_BATCH_SIZE):
+        days = int(self.env["ir.config_parameter"].sudo().get_param("library_management.archive_days", ARCHIVE_DAYS))
+        horizon = fields.Date.context_today(self) - timedelta(days=days)
+        cr = self.env.cr
+        self.env.flush_all()
+
+        moved = 0
+        while True:
+            cr.execute(SQL(
+                """
+                SELECT b.id FROM library_borrow b
+                 WHERE b.status = 'returned'
+                   AND b.return_date < %s
+                   AND NOT EXISTS (
+                        SELECT 1 FROM library_fine f
+                         WHERE f.borrow_id = b.id AND f.status = 'unpaid'
+                       )
+              ORDER BY b.id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+                """,
+                horizon, batch_size,
+            ))
+            borrow_ids = [row[0] for row in cr.fetchall()]
+            if not borrow_ids:
+                break
+
+            cr.execute(SQL(
+                """
+                INSERT INTO library_borrow_archive
+                       (original_id, member_id, book_id, borrow_date, return_date, due_date, fine_amount)
+                SELECT b.id, b.member_id, b.book_id, b.borrow_date, b.return_date, b.due_date,
+                       COALESCE(f.amount, 0)
+                  FROM library_borrow b
+             LEFT JOIN (
+                        SELECT borrow_id, sum(amount) AS amount
+                          FROM library_fine
+                         WHERE borrow_id = ANY(%s)
+                      GROUP BY borrow_id
+                       ) f ON f.borrow_id = b.id
+                 WHERE b.id = ANY(%s)
+                """,
+                borrow_ids, borrow_ids,
+            ))
+            cr.execute(SQL("DELETE FROM library_fine WHERE borrow_id = ANY(%s)", borrow_ids))
+            cr.execute(SQL(
+                "DELETE FROM library_borrow WHERE id = ANY(%s) RETURNING book_id, member_id",
+                borrow_ids,
+            ))
+            rows = cr.fetchall()
+            self._update_history_counters(rows)
+
+            moved += len(borrow_ids)
+            cr.commit()
+            self.env.invalidate_all()
+            _logger.info("Borrow archival: %s borrows moved", moved)
+
+    # Archived counts are bumped with one UPDATE per model; the live
+    # borrow_count counters are recomputed for the touched records
+    def _update_history_counters(self, rows):
+        for model, index in (("library.book", 0), ("library.member", 1)):
+            Model = self.env[model]
+            counts = {}
+            for row in rows:
+                counts[row[index]] = counts.get(row[index], 0) + 1
+            self.env.cr.execute(SQL(
+                """
+                UPDATE %s t
+                   SET archived_borrow_count = COALESCE(t.archived_borrow_count, 0) + c.qty
+                  FROM unnest(%s::int[], %s::int[]) AS c(id, qty)
+                 WHERE t.id = c.id
+                """,
+                SQL.identifier(Model._table), list(counts), list(counts.values()),
+            ))
+            Model.invalidate_model(["archived_borrow_count"])
+            records = Model.browse(list(counts))
+            self.env.add_to_compute(Model._fields["borrow_count"], records)
+            records.flush_recordset(["borrow_count"])
+
+    # Archived part of the borrow export, same columns as
+    # library.borrow._export_query. Archived loans are all returned; their
+    # accrued fine is the amount of the fines archived with them
+    @api.model
+    def _export_borrows_query(self, filters):
+        if filters.get("status") and filters["status"] != "returned":
+            return None
+        query = self._search(export_domain(filters, "borrow_date", "book_id.category_id"))
+        return SQL(
+            """
+            SELECT a.original_id, bk.book_code, bk.name, m.name, m.email, a.borrow_date,
+                   a.due_date, a.return_date, 'returned', a.fine_amount, TRUE
+              FROM library_borrow_archive a
+              JOIN library_book bk ON bk.id = a.book_id
+              JOIN library_member m ON m.id = a.member_id
+             WHERE a.id IN %s
+          ORDER BY a.id
+            """,
+            query.subselect(),
+        )
+
+    # Archived part of the fine export: archival deletes the paid fines and
+    # keeps their total per loan, exported as one paid fine dated on return
+    @api.model
+    def _export_fines_query(self, filters):
+        if filters.get("status") and filters["status"] != "paid":
+            return None
+        domain = export_domain(filters, "return_date", "book_id.category_id") & Domain("fine_amount", ">", 0)
+        query = self._search(domain)
+        return SQL(
+            """
+            SELECT NULL::int, a.original_id, bk.book_code, bk.name, m.name, m.email,
+                   a.return_date, a.fine_amount, 'paid', TRUE
+              FROM library_borrow_archive a
+              JOIN library_book bk ON bk.id = a.book_id
+              JOIN library_member m ON m.id = a.member_id
+             WHERE a.id IN %s
+          ORDER BY a.id
+            """,
+            query.subselect(),
+        )
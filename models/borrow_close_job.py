@@ -0,0 +1,89 @@
+import logging
+
+from odoo import models, fields, api
+from odoo.tools.safe_eval import safe_eval
+
+_logger = logging.getLogger(__name__)
+
+# Borrows closed per committed chunk
+CLOSE_CHUNK_SIZE = 1000
+
+
+class LibraryBorrowCloseJob(models.Model):
+    _name = "library.borrow.close.job"
+    _description = "Library Bulk Close-out Job"
+    _order = "id desc"
+
+    borrow_ids = fields.Many2many("library.borrow", string="Borrow Records", readonly=True)
+    # used instead of borrow_ids for selections too large to send as ids
+    domain = fields.Char(string="Domain", readonly=True)
+    return_date = fields.Date(string="Return Date", required=True, readonly=True)
+    state = fields.Selection(
+        [
+            ("queued", "Queued"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        string="Status",
+        default="queued",
+        readonly=True,
+        copy=False,
+    )
+    borrow_total = fields.Integer(string="Selected Borrows", readonly=True)
+    closed_count = fields.Integer(string="Closed", readonly=True, copy=False)
+    returned_count = fields.Integer(string="Already Returned", readonly=True)
+    fine_count = fields.Integer(string="Fines Generated", readonly=True, copy=False)
+    error = fields.Text(string="Error", readonly=True, copy=False)
+
+    def _get_domain(self):
+        if self.domain:
+            return safe_eval(self.domain)
+        return [("id", "in", self.borrow_ids.ids)]
+
+    #Queues the job for the background cron. A failed job resumes with the
+    #borrows still open, the closed chunks are committed
+    def action_queue(self):
+        self.write({"state": "queued", "error": False})
+        self.env.ref("library_management.ir_cron_library_borrow_close").sudo()._trigger()
+
+    @api.model
+    def _cron_run_jobs(self):
+        for job in self.search([("state", "in", ("queued", "running"))], order="id"):
+            job._run()
+
+    # Closes the open borrows of the selection chunk by chunk through the
+    # regular return path (copies given back, late fines generated). Each
+    # chunk is committed with the counters, so a crash or a timeout never
+    # loses the chunks already closed
+    def _run(self):
+        self.ensure_one()
+        self.write({"state": "running", "error": False})
+        self.env.cr.commit()
+
+        Borrow = self.env["library.borrow"]
+        Fine = self.env["library.fine"]
+        domain = self._get_domain() + [("status", "=", "borrowed")]
+        try:
+            while True:
+                chunk = Borrow.search(domain, order="id", limit=CLOSE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                fines_before = Fine.search_count([("borrow_id", "in", chunk.ids)])
+                chunk.write({"status": "returned", "return_date": self.return_date})
+                fines_after = Fine.search_count([("borrow_id", "in", chunk.ids)])
+                self.write({
+                    "closed_count": self.closed_count + len(chunk),
+                    "fine_count": self.fine_count + fines_after - fines_before,
+                })
+                self.env.cr.commit()
+                self.env.invalidate_all()
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.exception("Bulk close-out %s failed", self.id)
+            self.write({"state": "failed", "error": str(e)})
+            self.env.cr.commit()
+            return
+
+        self.state = "done"
+        self.env.cr.commit()
@@ -1,51 +1,89 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.fields import Domain
+from odoo.tools import SQL
+
+from .books import export_domain, export_with_archive
+from .perf import instrument
 
 class LibraryFine(models.Model):
 	_name="library.fine"
 	_description="Library Fine model"
 
-	member_id=fields.Many2one("library.member",string="Member",required=True)
-	borrow_id=fields.Many2one("library.borrow",string="Borrowed Record", required=True)
+	member_id=fields.Many2one("library.member",string="Member",required=True,index=True)
+	borrow_id=fields.Many2one("library.borrow",string="Borrowed Record", required=True,index=True)
 	fine_date=fields.Date(default=fields.Date.today) 
 	amount=fields.Float(string="Fine Amount",required=True)
 	active = fields.Boolean(default=True)
 
 	status=fields.Selection([('unpaid','Unpaid'),('paid','Paid')],
 		string="Status",
-		default="unpaid"
+		default="unpaid",
+		index=True
 		)
 
 	active=fields.Boolean(default=True)
 
+	#only one unpaid fine per borrow, enforced by PostgreSQL
+	_unique_unpaid_fine=models.UniqueIndex(
+		"(borrow_id, member_id) WHERE status = 'unpaid'",
+		"An unpaid fine already exists",
+	)
+
 	#This write method will auto archive the member records from fine model when his fine status is changed to paid
+	#status and archive go in the same UPDATE
+	@instrument
 	def write(self,vals):
-		res=super().write(vals)
-
 		#auto archive fine when paid
 		if vals.get("status") == "paid":
-			self.filtered(lambda f:f.status=="paid").write({"active":False})
+			vals=dict(vals,active=False)
+
+		return super().write(vals)
 
-		return res
+	#Pays every unpaid fine of the given members in one write and returns
+	#{member: (number of fines, amount)} with the settled totals
+	@api.model
+	@instrument
+	def _settle_members(self,members):
+		groups=self._read_group(
+			[("member_id", "in", members.ids), ("status", "=", "unpaid")],
+			groupby=["member_id"],
+			aggregates=["id:recordset","amount:sum"],
+		)
+		fine_ids=[]
+		totals={}
+		for member,member_fines,amount in groups:
+			fine_ids.extend(member_fines.ids)
+			totals[member]=(len(member_fines),amount)
 
+		self.browse(fine_ids).write({"status":"paid"})
+		return totals
 
-	#this will restrict the member to borrow another book if fine is pending
-	@api.constrains("member_id","borrow_id","status")
-	def _check_duplicate_unpaid_fines(self):
-		for rec in self:
-			if not rec.member_id or not rec.borrow_id:
-				continue
-
-			if rec.status == "unpaid":
-				domain=[
-						("borrow_id", "=", rec.borrow_id.id),
-						("member_id", "=", rec.member_id.id),
-						("status", "=", "unpaid"),
-						("id", "!=", rec.id)
-				]
-
-				if self.search_count(domain)>0:
-					raise ValidationError("An unpaid fine already exists")
+
+	#Streaming export of the fines, paid ones included, filtered on fine_date,
+	#status and the book category. Fines deleted by the borrow archival follow
+	#(one paid row per archived loan) unless include_archive is "0"
+	@api.model
+	def _export_query(self,filters):
+		domain=export_domain(filters,"fine_date","borrow_id.book_id.category_id")
+		if filters.get("status"):
+			domain&=Domain("status","=",filters["status"])
+		query=self.with_context(active_test=False)._search(domain)
+		columns=["id","borrow_id","book_code","book","member","email","fine_date","amount","status","archived"]
+		live=SQL(
+			"""
+			SELECT f.id, f.borrow_id, bk.book_code, bk.name, m.name, m.email,
+			       f.fine_date, f.amount, f.status, FALSE
+			  FROM library_fine f
+			  JOIN library_borrow b ON b.id = f.borrow_id
+			  JOIN library_book bk ON bk.id = b.book_id
+			  JOIN library_member m ON m.id = f.member_id
+			 WHERE f.id IN %s
+		  ORDER BY f.id
+			""",
+			query.subselect(),
+		)
+		return columns,export_with_archive(live,filters,self.env["library.borrow.archive"]._export_fines_query)
 
 
 	#This method will show pop-up when admin will delete the record whose fine is still pending
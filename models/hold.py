@@ -0,0 +1,167 @@
+from collections import Counter
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import SQL
+
+# Days a member has to pick up a copy allocated to their hold, can be
+# overridden with the library_management.hold_days system parameter
+HOLD_DAYS = 3
+HOLD_EXPIRY_BATCH_SIZE = 1000
+
+
+class LibraryHold(models.Model):
+    _name = "library.hold"
+    _description = "Library Hold"
+    _order = "book_id, position"
+
+    book_id = fields.Many2one("library.book", string="Book", required=True, ondelete="cascade")
+    member_id = fields.Many2one("library.member", string="Member", required=True, ondelete="cascade", index=True)
+    position = fields.Integer(string="Queue Position", readonly=True, copy=False)
+    request_date = fields.Date(string="Request Date", default=fields.Date.today, readonly=True)
+    ready_date = fields.Date(string="Ready Since", readonly=True, copy=False)
+    expiry_date = fields.Date(string="Pick Up Before", readonly=True, copy=False)
+    state = fields.Selection(
+        [
+            ("waiting", "Waiting"),
+            ("ready", "Ready"),
+            ("fulfilled", "Fulfilled"),
+            ("cancelled", "Cancelled"),
+            ("expired", "Expired"),
+        ],
+        string="Status",
+        default="waiting",
+        readonly=True,
+        copy=False,
+    )
+
+    # Head of each book's queue is the first row of this index
+    _queue_idx = models.Index("(book_id, position) WHERE state = 'waiting'")
+    _unique_position = models.UniqueIndex("(book_id, position)")
+    _unique_open_hold = models.UniqueIndex(
+        "(book_id, member_id) WHERE state IN ('waiting', 'ready')",
+        "This member already has a hold on this book.",
+    )
+    _expiry_idx = models.Index("(expiry_date) WHERE state = 'ready'")
+
+    # Holds are appended at the end of their book's queue. The books are
+    # locked first so concurrent hold requests and returns are serialized
+    @api.model_create_multi
+    def create(self, vals_list):
+        book_ids = sorted({vals["book_id"] for vals in vals_list if vals.get("book_id")})
+        if book_ids:
+            self.env["library.book"].flush_model(["available_copies"])
+            self.env.cr.execute(SQL(
+                """
+                SELECT id, available_copies,
+                       (SELECT max(position) FROM library_hold WHERE book_id = b.id)
+                  FROM library_book b
+                 WHERE id = ANY(%s)
+              ORDER BY id
+                   FOR UPDATE
+                """,
+                book_ids,
+            ))
+            rows = self.env.cr.fetchall()
+            if any(available_copies > 0 for _book_id, available_copies, _position in rows):
+                raise ValidationError("This book is available, it can be borrowed directly.")
+            last_position = {book_id: position or 0 for book_id, _available_copies, position in rows}
+            # rows without a book are left to the required-field check
+            for vals in vals_list:
+                if vals.get("book_id") in last_position:
+                    last_position[vals["book_id"]] += 1
+                    vals["position"] = last_position[vals["book_id"]]
+        return super().create(vals_list)
+
+    @api.model
+    def _get_hold_days(self):
+        return int(self.env["ir.config_parameter"].sudo().get_param("library_management.hold_days", HOLD_DAYS))
+
+    # Allocates returned copies to the head of each book's queue: counts maps
+    # book id -> copies given back. Called from library.book._release_copies,
+    # with the book rows already locked by its UPDATE. Allocated copies are
+    # taken again right away so they are kept for the hold
+    @api.model
+    def _allocate(self, counts):
+        book_ids = sorted(counts)
+        self.flush_model(["state", "position"])
+        self.env.cr.execute(SQL(
+            """
+            SELECT h.id, h.book_id
+              FROM unnest(%s::int[], %s::int[]) AS c(book_id, qty)
+        CROSS JOIN LATERAL (
+                    SELECT id, book_id FROM library_hold
+                     WHERE book_id = c.book_id AND state = 'waiting'
+                  ORDER BY position
+                     LIMIT c.qty
+                   ) h
+            """,
+            book_ids, [counts[book_id] for book_id in book_ids],
+        ))
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return
+
+        today = fields.Date.context_today(self)
+        self.browse([row[0] for row in rows]).write({
+            "state": "ready",
+            "ready_date": today,
+            "expiry_date": today + timedelta(days=self._get_hold_days()),
+        })
+        self.env["library.book"]._checkout_copies(Counter(row[1] for row in rows))
+
+    # Marks the open holds matching the given (book id, member id) pairs as
+    # fulfilled. Returns the pairs whose copy was already kept for them
+    @api.model
+    def _fulfill(self, pairs):
+        if not pairs:
+            return set()
+        holds = self.search_fetch(
+            [
+                ("state", "in", ("waiting", "ready")),
+                ("book_id", "in", [pair[0] for pair in pairs]),
+                ("member_id", "in", [pair[1] for pair in pairs]),
+            ],
+            ["book_id", "member_id", "state"],
+        ).filtered(lambda h: (h.book_id.id, h.member_id.id) in pairs)
+        held = {(hold.book_id.id, hold.member_id.id) for hold in holds if hold.state == "ready"}
+        holds.write({"state": "fulfilled"})
+        return held
+
+    def action_cancel(self):
+        if self.filtered(lambda h: h.state not in ("waiting", "ready")):
+            raise UserError("Only waiting or ready holds can be cancelled.")
+        ready = self.filtered(lambda h: h.state == "ready")
+        self.write({"state": "cancelled"})
+        self.env["library.book"]._release_copies(Counter(hold.book_id.id for hold in ready))
+
+    # Expires the ready holds that were not picked up, in batches. Their copies
+    # go to the next member in line (or back on the shelf)
+    @api.model
+    def _cron_expire_holds(self, batch_size=HOLD_EXPIRY_BATCH_SIZE):
+        today = fields.Date.context_today(self)
+        self.env.flush_all()
+        while True:
+            self.env.cr.execute(SQL(
+                """
+                UPDATE library_hold h
+                   SET state = 'expired'
+                  FROM (
+                        SELECT id FROM library_hold
+                         WHERE state = 'ready' AND expiry_date < %s
+                      ORDER BY id
+                         LIMIT %s
+                           FOR UPDATE SKIP LOCKED
+                       ) batch
+                 WHERE h.id = batch.id
+             RETURNING h.book_id
+                """,
+                today, batch_size,
+            ))
+            book_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not book_ids:
+                break
+            self.invalidate_model(["state"])
+            self.env["library.book"]._release_copies(Counter(book_ids))
+            self.env.cr.commit()
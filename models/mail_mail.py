@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+# Failed overdue reminders are retried up to REMINDER_MAX_RETRIES times,
+# waiting REMINDER_RETRY_DELAY minutes more after each failure
+REMINDER_MAX_RETRIES = 3
+REMINDER_RETRY_DELAY = 15
+
+
+class MailMail(models.Model):
+    _inherit = "mail.mail"
+
+    library_reminder = fields.Boolean(string="Library Overdue Reminder", readonly=True)
+    library_retry_count = fields.Integer(string="Reminder Retries", readonly=True)
+
+    _library_reminder_idx = models.Index("(state, scheduled_date) WHERE library_reminder")
+
+    # Puts failed reminders back in the queue with a growing delay
+    @api.model
+    def _cron_retry_library_reminders(self):
+        failed = self.search([
+            ("library_reminder", "=", True),
+            ("state", "=", "exception"),
+            ("library_retry_count", "<", REMINDER_MAX_RETRIES),
+        ])
+        now = fields.Datetime.now()
+        for retry_count in set(failed.mapped("library_retry_count")):
+            batch = failed.filtered(lambda mail: mail.library_retry_count == retry_count)
+            batch.write({
+                "state": "outgoing",
+                "failure_type": False,
+                "failure_reason": False,
+                "library_retry_count": retry_count + 1,
+                "scheduled_date": now + timedelta(minutes=REMINDER_RETRY_DELAY * (retry_count + 1)),
+            })
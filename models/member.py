@@ -1,60 +1,195 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
 import re
 
+from .books import RECENT_HISTORY_LIMIT
+from .perf import instrument
+
+EMAIL_REGEX = re.compile(r"^[\w+\.-]+@\w+\.\w+$")
+
+
+#Returns the validation message for a phone number, or None when it is valid
+def phone_error(phone):
+    if not phone.isdigit():
+        return "Phone number must be in digit"
+    if len(phone)!=10:
+        return "Phone number must be of 10 digits only"
+    return None
+
+
 class LibraryMember(models.Model):
     _name = "library.member"
     _description = "Library Members"
 
     name = fields.Char(string="Name", required=True)
-    phone = fields.Char(string="Phone", required=True)
+    phone = fields.Char(string="Phone", required=True, index=True)
     email = fields.Char(string="Email Address", required=True)
     membership_date = fields.Date(default=fields.Date.today, string="Membership Date", required=True)
     active = fields.Boolean(string="Active", default=True)
 
+    # Case-insensitive email uniqueness, enforced by PostgreSQL. The index also
+    # serves the duplicate lookups of bulk enrolment
+    _email_lower_uniq = models.UniqueIndex("(lower(email))", "This email already exist")
+    _unpaid_fines_idx = models.Index("(id) WHERE has_unpaid_fines")
+
     borrow_ids = fields.One2many("library.borrow","member_id",string="Borrowed Books")
-    borrow_count = fields.Integer(string="Borrow Count", compute="_compute_borrow_count")
+    recent_borrow_ids = fields.Many2many("library.borrow", string="Recent Borrows", compute="_compute_recent_borrow_ids")
+    borrow_count = fields.Integer(string="Borrow Count", compute="_compute_borrow_count", store=True)
+    archived_borrow_count = fields.Integer(string="Archived Borrows", readonly=True, copy=False)
+    recommended_book_ids = fields.Many2many(
+        "library.book", string="Suggested Books", compute="_compute_recommended_book_ids"
+    )
 
     fine_ids = fields.One2many("library.fine", "member_id", string="Fines")
-    fine_count = fields.Integer(string="Fine Count", compute="_compute_fine_count")
+    fine_count = fields.Integer(string="Fine Count", compute="_compute_fine_count", store=True)
+    fine_amount_due = fields.Float(string="Outstanding Fines", compute="_compute_fine_count", store=True)
+    # Checkout gate, read once per borrow batch
+    has_unpaid_fines = fields.Boolean(string="Has Unpaid Fines", compute="_compute_fine_count", store=True)
 
     #Compute field shows total number of book the member borrowed
-    @api.depends("borrow_ids")
+    #Counters are stored and computed with one read_group per recordset
+    @api.depends("borrow_ids", "borrow_ids.active")
+    @instrument
     def _compute_borrow_count(self):
+        counts = dict(self.env["library.borrow"]._read_group(
+            [("member_id", "in", self.ids)],
+            groupby=["member_id"],
+            aggregates=["__count"],
+        ))
         for member in self:
-            member.borrow_count = len(member.borrow_ids)
+            member.borrow_count = counts.get(member._origin, 0)
+
 
+    #Only the latest borrows are loaded in the form, full history is behind the smart button
+    def _compute_recent_borrow_ids(self):
+        Borrow = self.env["library.borrow"]
+        for member in self:
+            member.recent_borrow_ids = Borrow.search(
+                [("member_id", "=", member._origin.id)], limit=RECENT_HISTORY_LIMIT
+            ) if member._origin else Borrow
+
+    def _compute_recommended_book_ids(self):
+        Recommendation = self.env["library.book.recommendation"]
+        for member in self:
+            member.recommended_book_ids = Recommendation._suggest_for_member(member._origin.id)
 
-    @api.depends("fine_ids")
+    @api.depends("fine_ids", "fine_ids.active", "fine_ids.status", "fine_ids.amount")
+    @instrument
     def _compute_fine_count(self):
+        groups = self.env["library.fine"]._read_group(
+            [("member_id", "in", self.ids)],
+            groupby=["member_id", "status"],
+            aggregates=["__count", "amount:sum"],
+        )
+        fine_count = {}
+        amount_due = {}
+        for member, status, count, amount in groups:
+            fine_count[member] = fine_count.get(member, 0) + count
+            if status == "unpaid":
+                amount_due[member] = amount_due.get(member, 0.0) + amount
+
         for member in self:
-            member.fine_count=len(member.fine_ids)
+            member.fine_count = fine_count.get(member._origin, 0)
+            member.fine_amount_due = amount_due.get(member._origin, 0.0)
+            member.has_unpaid_fines = member._origin in amount_due
 
     #Constrain added to validate mobile number
     @api.constrains("phone")
+    @instrument
     def _check_phone(self):
         for rec in self:
             if rec.phone:
-                if not rec.phone.isdigit():
-                    raise ValidationError("Phone number must be in digit")
-                if len(rec.phone)!=10:
-                    raise ValidationError("Phone number must be of 10 digits only")
+                error=phone_error(rec.phone)
+                if error:
+                    raise ValidationError(error)
 
     #constarin added to validate email adderess
+    #duplicates are rejected by the lower(email) unique index
     @api.constrains("email")
+    @instrument
     def _check_email(self):
-        email_regex=r"^[\w+\.-]+@\w+\.\w+$"
         for rec in self:
-            if rec.email and not re.match(email_regex,rec.email):
+            if rec.email and not EMAIL_REGEX.match(rec.email):
                 raise ValidationError("Please enter valid email")
 
-            if rec.email:
-                domain=[
-                    ("email", "=", rec.email),
-                    ("id", "!=", rec.id)
-                ]
-                if self.search_count(domain)>0:
-                    raise ValidationError("This email already exist")
+    # Bulk enrolment: validates the whole batch in memory, finds existing
+    # emails with one query on the lower(email) index and creates the valid
+    # rows with one create. Rejected rows are returned instead of aborting:
+    # (members, [{"row": n, "email": ..., "error": ...}])
+    @api.model
+    def _enroll(self, rows, first_row=1):
+        errors = []
+        valid = []
+        seen = set()
+        for row_no, row in enumerate(rows, start=first_row):
+            # JSON Lines files may carry numbers, e.g. a numeric phone
+            name = str(row.get("name") or "").strip()
+            phone = str(row.get("phone") or "").strip()
+            email = str(row.get("email") or "").strip()
+            membership_date = row.get("membership_date") or False
+            try:
+                membership_date = fields.Date.to_date(membership_date)
+                date_error = False
+            except (TypeError, ValueError):
+                date_error = True
+            if not name or not phone or not email:
+                error = "Name, phone and email are required"
+            elif not EMAIL_REGEX.match(email):
+                error = "Please enter valid email"
+            elif email.lower() in seen:
+                error = "This email is duplicated in the file"
+            elif date_error:
+                error = "Membership date must be a date (YYYY-MM-DD)"
+            else:
+                error = phone_error(phone)
+            if error:
+                errors.append({"row": row_no, "email": email, "error": error})
+                continue
+            seen.add(email.lower())
+            vals = {"name": name, "phone": phone, "email": email}
+            if membership_date:
+                vals["membership_date"] = membership_date
+            valid.append((row_no, vals))
+
+        existing = set()
+        if seen:
+            self.env.cr.execute(SQL(
+                "SELECT lower(email) FROM library_member WHERE lower(email) = ANY(%s)",
+                list(seen),
+            ))
+            existing = {row[0] for row in self.env.cr.fetchall()}
+
+        vals_list = []
+        for row_no, vals in valid:
+            if vals["email"].lower() in existing:
+                errors.append({"row": row_no, "email": vals["email"], "error": "This email already exist"})
+            else:
+                vals_list.append(vals)
+        # error file follows the input order
+        errors.sort(key=lambda error: error["row"])
+        return self.create(vals_list), errors
+
+    # Maps lowercased emails and phones of active members to member ids,
+    # through the lower(email) and phone indexes
+    @api.model
+    def _find_members(self, idents):
+        idents = [ident for ident in idents if ident]
+        if not idents:
+            return {}
+        self.flush_model(["email", "phone", "active"])
+        self.env.cr.execute(SQL(
+            """
+            SELECT id, lower(email), phone FROM library_member
+             WHERE active AND (lower(email) = ANY(%s) OR phone = ANY(%s))
+            """,
+            [ident.lower() for ident in idents], idents,
+        ))
+        members = {}
+        for member_id, email, phone in self.env.cr.fetchall():
+            members[email] = member_id
+            members[phone] = member_id
+        return members
 
     #Borrow Smart button action
     def action_open_borrow_history(self):
@@ -70,6 +205,17 @@ class LibraryMember(models.Model):
             }
         }
 
+    #Archived borrows smart button action
+    def action_open_archived_history(self):
+        self.ensure_one()
+        return {
+            'name': 'Archived Borrow History',
+            'type': 'ir.actions.act_window',
+            'res_model': 'library.borrow.archive',
+            'view_mode': 'list',
+            'domain': [('member_id', '=', self.id)],
+        }
+
     #Fines smart button action
     def action_open_fines(self):
         self.ensure_one()
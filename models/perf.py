@@ -0,0 +1,130 @@
+import functools
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from odoo import models, fields, api, SUPERUSER_ID
+from odoo.tools import str2bool
+
+_logger = logging.getLogger(__name__)
+
+# Instrumentation is switched on with the library_management.perf_enabled
+# system parameter. The flag is re-read at most every FLAG_TTL seconds and
+# samples are flushed to library.perf.sample every FLUSH_INTERVAL seconds
+FLAG_TTL = 10
+FLUSH_INTERVAL = 60
+SAMPLE_RETENTION_DAYS = 30
+
+_lock = threading.Lock()
+# dbname -> (enabled, checked at)
+_flags = {}
+# dbname -> {method: [calls, queries, total seconds, max seconds]}
+_stats = {}
+# dbname -> last flush time
+_flushed = {}
+
+
+def _is_enabled(env):
+    dbname = env.cr.dbname
+    enabled, checked = _flags.get(dbname, (False, 0))
+    now = time.monotonic()
+    if now - checked > FLAG_TTL:
+        # "False" or "0" in the parameter switch it off, unknown values too
+        enabled = str2bool(
+            env["ir.config_parameter"].sudo().get_param("library_management.perf_enabled") or "0",
+            default=False,
+        )
+        _flags[dbname] = (enabled, now)
+    return enabled
+
+
+# Records call count, SQL query count and wall time of a model method when
+# instrumentation is enabled. Apply it below the api decorators
+def instrument(method):
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not _is_enabled(self.env):
+            return method(self, *args, **kwargs)
+
+        cr = self.env.cr
+        queries = cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _record(self.env, name, cr.sql_log_count - queries, time.perf_counter() - start)
+
+    return wrapper
+
+
+def _record(env, name, queries, duration):
+    dbname = env.cr.dbname
+    with _lock:
+        stat = _stats.setdefault(dbname, {}).setdefault(name, [0, 0, 0.0, 0.0])
+        stat[0] += 1
+        stat[1] += queries
+        stat[2] += duration
+        stat[3] = max(stat[3], duration)
+
+        now = time.monotonic()
+        last = _flushed.setdefault(dbname, now)
+        if now - last < FLUSH_INTERVAL:
+            return
+        _flushed[dbname] = now
+        samples = _stats.pop(dbname)
+    _flush(env, samples)
+
+
+# Writes the aggregated samples with a separate cursor so they are kept even
+# when the instrumented transaction rolls back
+def _flush(env, samples):
+    sample_date = fields.Datetime.now()
+    vals_list = [
+        {
+            "name": name,
+            "calls": calls,
+            "queries": queries,
+            "duration_total": total,
+            "duration_max": longest,
+            "sample_date": sample_date,
+        }
+        for name, (calls, queries, total, longest) in samples.items()
+    ]
+    try:
+        with env.registry.cursor() as cr:
+            api.Environment(cr, SUPERUSER_ID, {})["library.perf.sample"].create(vals_list)
+    except Exception:
+        _logger.exception("Could not store library performance samples")
+    for vals in sorted(vals_list, key=lambda vals: vals["duration_total"], reverse=True):
+        _logger.info(
+            "library perf %s: %s calls, %s queries, %.3fs total, %.3fs max",
+            vals["name"], vals["calls"], vals["queries"], vals["duration_total"], vals["duration_max"],
+        )
+
+
+class LibraryPerfSample(models.Model):
+    _name = "library.perf.sample"
+    _description = "Library Performance Sample"
+    _order = "duration_total desc"
+
+    name = fields.Char(string="Method", required=True, readonly=True, index=True)
+    sample_date = fields.Datetime(string="Sampled On", readonly=True, index=True)
+    calls = fields.Integer(string="Calls", readonly=True)
+    queries = fields.Integer(string="Queries", readonly=True)
+    duration_total = fields.Float(string="Total Time (s)", readonly=True, digits=(16, 4))
+    duration_max = fields.Float(string="Max Time (s)", readonly=True, digits=(16, 4), aggregator="max")
+    duration_avg = fields.Float(string="Avg Time (s)", compute="_compute_averages", digits=(16, 4))
+    queries_avg = fields.Float(string="Avg Queries", compute="_compute_averages", digits=(16, 1))
+
+    def _compute_averages(self):
+        for sample in self:
+            sample.duration_avg = sample.calls and sample.duration_total / sample.calls
+            sample.queries_avg = sample.calls and sample.queries / sample.calls
+
+    @api.autovacuum
+    def _gc_samples(self):
+        limit = fields.Datetime.now() - timedelta(days=SAMPLE_RETENTION_DAYS)
+        self.search([("sample_date", "<", limit)]).unlink()
@@ -0,0 +1,40 @@
+import csv
+import io
+import json
+
+from odoo import models
+from odoo.exceptions import UserError
+
+
+class LibraryStreamMixin(models.AbstractModel):
+    _name = "library.stream.mixin"
+    _description = "Library File Streaming Mixin"
+
+    # Opens a Binary(attachment=True) field from the filestore without
+    # loading it in memory
+    def _open_binary_stream(self, field_name):
+        self.ensure_one()
+        attachment = self.env["ir.attachment"].sudo().search(
+            [
+                ("res_model", "=", self._name),
+                ("res_field", "=", field_name),
+                ("res_id", "=", self.id),
+            ],
+            limit=1,
+        )
+        if not attachment:
+            raise UserError("No file to import.")
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), "rb")
+        return io.BytesIO(attachment.raw)
+
+    # Yields one dict per CSV row or JSON line
+    def _iter_file_rows(self, stream, file_format):
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        if file_format == "csv":
+            yield from csv.DictReader(text)
+            return
+        for line in text:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
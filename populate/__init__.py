@@ -0,0 +1,30 @@
+import random
+
+from .books import populate_books, populate_borrows
+from .fine import populate_fines
+from .member import populate_members
+
+# Records per model for each size
+SIZES = {
+    "small": {"library.book": 500, "library.member": 200, "library.borrow": 2000, "library.fine": 300},
+    "medium": {"library.book": 50000, "library.member": 20000, "library.borrow": 100000, "library.fine": 15000},
+    "large": {"library.book": 200000, "library.member": 100000, "library.borrow": 1000000, "library.fine": 150000},
+}
+
+
+# Fills the database with a production-like library. The generator does not
+# depend on the odoo-bin populate framework, it runs from an Odoo shell:
+#
+#   $ odoo-bin shell -d library
+#   >>> from odoo.addons.library_management.populate import populate
+#   >>> populate(env, "medium")
+#
+# Every batch is committed so large sizes keep memory flat
+def populate(env, size="small", seed=42):
+    sizes = SIZES[size]
+    rand = random.Random(seed)
+    book_ids = populate_books(env, sizes["library.book"], rand)
+    member_ids = populate_members(env, sizes["library.member"], rand)
+    borrow_ids = populate_borrows(env, sizes["library.borrow"], member_ids, book_ids, rand)
+    populate_fines(env, sizes["library.fine"], borrow_ids, rand)
+
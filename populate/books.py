@@ -0,0 +1,69 @@
+from collections import Counter
+from datetime import timedelta
+
+from odoo import fields
+
+from ..models.books import ALLOWED_DAYS
+from .common import create_in_batches, zipf_cum_weights
+
+# Authors generated per book
+AUTHORS_RATIO = 10
+
+
+def populate_books(env, count, rand):
+    today = fields.Date.today()
+    author_ids = create_in_batches(env, "res.partner", (
+        {"name": "Author %s" % counter} for counter in range(max(count // AUTHORS_RATIO, 1))
+    ))
+    return create_in_batches(env, "library.book", (
+        {
+            "name": "Book %s" % counter,
+            "author_id": rand.choice(author_ids),
+            "publish_date": today - timedelta(days=rand.randint(0, 36500)),
+            "price": round(rand.uniform(50, 2000), 2),
+            "pages": rand.randint(40, 1200),
+            "copies": rand.choices([1, 2, 3, 5, 10], [50, 25, 15, 7, 3])[0],
+        }
+        for counter in range(count)
+    ))
+
+
+def populate_borrows(env, count, member_ids, book_ids, rand):
+    member_weights = zipf_cum_weights(len(member_ids))
+    book_weights = zipf_cum_weights(len(book_ids))
+    copies = {
+        book["id"]: book["copies"]
+        for book in env["library.book"].search_read([("id", "in", book_ids)], ["copies"])
+    }
+    today = fields.Date.today()
+
+    # Open loans handed out so far: at most `copies` per book and one per
+    # member/book pair, matching checkout and the unique index
+    on_loan = Counter()
+    active_pairs = set()
+
+    def borrow_vals():
+        member_id = rand.choices(member_ids, cum_weights=member_weights)[0]
+        book_id = rand.choices(book_ids, cum_weights=book_weights)[0]
+        # most loans are recent, with an overdue tail
+        borrow_date = today - timedelta(days=int(rand.expovariate(1 / 60)) % 1500)
+        pair = (book_id, member_id)
+        if rand.random() < 0.15 and on_loan[book_id] < copies[book_id] and pair not in active_pairs:
+            on_loan[book_id] += 1
+            active_pairs.add(pair)
+            return {"member_id": member_id, "book_id": book_id, "borrow_date": borrow_date, "status": "borrowed"}
+
+        # a quarter of the returns come back late
+        if rand.random() < 0.25:
+            days = ALLOWED_DAYS + rand.randint(1, 60)
+        else:
+            days = rand.randint(0, ALLOWED_DAYS)
+        return {
+            "member_id": member_id,
+            "book_id": book_id,
+            "borrow_date": borrow_date,
+            "status": "returned",
+            "return_date": min(borrow_date + timedelta(days=days), today),
+        }
+
+    return create_in_batches(env, "library.borrow", (borrow_vals() for _i in range(count)))
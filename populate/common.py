@@ -0,0 +1,32 @@
+from itertools import accumulate
+
+# Records created per create call
+BATCH_SIZE = 10000
+
+
+def zipf_cum_weights(size):
+    # Rank i is picked with weight 1 / (i + 1): a few very popular records
+    # and a long tail
+    return list(accumulate(1 / (rank + 1) for rank in range(size)))
+
+
+# Creates the records through the batched create of the model, committing
+# each batch. Returns the ids
+def create_in_batches(env, model, vals_iter):
+    ids = []
+    vals_list = []
+    for vals in vals_iter:
+        vals_list.append(vals)
+        if len(vals_list) == BATCH_SIZE:
+            ids.extend(_create(env, model, vals_list))
+            vals_list = []
+    if vals_list:
+        ids.extend(_create(env, model, vals_list))
+    return ids
+
+
+def _create(env, model, vals_list):
+    ids = env[model].create(vals_list).ids
+    env.cr.commit()
+    env.invalidate_all()
+    return ids
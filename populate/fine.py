@@ -0,0 +1,44 @@
+from odoo.tools import SQL
+
+from ..models.books import FINE_PER_DAY
+from .common import create_in_batches
+
+
+#Fines are generated for late returns, one per borrow. Once every late
+#borrow has a fine the extra ones are paid, so no duplicate unpaid fine
+#is ever created
+def populate_fines(env,count,borrow_ids,rand):
+	env.cr.execute(SQL(
+		"""
+		SELECT id, member_id, return_date - due_date
+		  FROM library_borrow
+		 WHERE id = ANY(%s) AND status = 'returned' AND return_date > due_date
+	  ORDER BY id
+		""",
+		borrow_ids,
+	))
+	late={
+		borrow_id:(member_id,late_days*FINE_PER_DAY)
+		for borrow_id,member_id,late_days in env.cr.fetchall()
+	}
+	late_ids=list(late)
+	if not late_ids:
+		return []
+
+	def fine_vals(counter):
+		if counter<len(late_ids):
+			borrow_id=late_ids[counter]
+			status="unpaid" if rand.random()<0.3 else "paid"
+		else:
+			borrow_id=rand.choice(late_ids)
+			status="paid"
+		member_id,amount=late[borrow_id]
+		return {
+			"borrow_id":borrow_id,
+			"member_id":member_id,
+			"amount":amount,
+			"status":status,
+			"active":status=="unpaid",
+		}
+
+	return create_in_batches(env,"library.fine",(fine_vals(counter) for counter in range(count)))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from odoo import fields
+
+from .common import create_in_batches
+
+
+def populate_members(env, count, rand):
+    today = fields.Date.today()
+    # phone and email derive from a counter: 10 digits and unique, also when
+    # the generator runs again on the same database
+    start = env["library.member"].with_context(active_test=False).search_count([])
+    return create_in_batches(env, "library.member", (
+        {
+            "name": "Member %s" % counter,
+            "phone": "9%09d" % counter,
+            "email": "member%s@example.com" % counter,
+            "membership_date": today - timedelta(days=rand.randint(0, 3650)),
+        }
+        for counter in range(start, start + count)
+    ))
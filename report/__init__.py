@@ -0,0 +1 @@
+from . import library_circulation_report
@@ -0,0 +1,100 @@
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+
+class LibraryCirculationReport(models.Model):
+    _name = "library.circulation.report"
+    _description = "Library Circulation Analysis"
+    _auto = False
+    _order = "borrow_date desc"
+
+    borrow_date = fields.Date(string="Borrow Date", readonly=True)
+    return_date = fields.Date(string="Return Date", readonly=True)
+    due_date = fields.Date(string="Due Date", readonly=True)
+    book_id = fields.Many2one("library.book", string="Book", readonly=True)
+    author_id = fields.Many2one("res.partner", string="Author", readonly=True)
+    category_id = fields.Many2one("library.category", string="Category", readonly=True)
+    member_id = fields.Many2one("library.member", string="Member", readonly=True)
+    status = fields.Selection(
+        [
+            ("borrowed", "Borrowed"),
+            ("returned", "Returned"),
+        ],
+        string="Status",
+        readonly=True,
+    )
+
+    borrow_count = fields.Integer(string="Borrows", readonly=True)
+    late_count = fields.Integer(string="Late Returns", readonly=True)
+    late_rate = fields.Float(string="Late Rate", aggregator="avg", readonly=True)
+    late_days = fields.Integer(string="Late Days", readonly=True)
+    fine_amount = fields.Float(string="Fines", readonly=True)
+    fine_paid_amount = fields.Float(string="Fine Revenue", readonly=True)
+
+    # One row per borrow (archived ones included), precomputed in a
+    # materialized view so dashboards never join borrows, fines and categories
+    # at request time. A book with several categories is reported under its
+    # first one so totals stay exact
+    def init(self):
+        self.env.cr.execute(SQL("DROP MATERIALIZED VIEW IF EXISTS %s CASCADE", SQL.identifier(self._table)))
+        self.env.cr.execute(SQL(
+            """
+            CREATE MATERIALIZED VIEW %s AS (
+                SELECT b.id AS id,
+                       b.borrow_date AS borrow_date,
+                       b.return_date AS return_date,
+                       b.due_date AS due_date,
+                       b.book_id AS book_id,
+                       bk.author_id AS author_id,
+                       cat.category_id AS category_id,
+                       b.member_id AS member_id,
+                       b.status AS status,
+                       1 AS borrow_count,
+                       CASE WHEN b.return_date > b.due_date THEN 1 ELSE 0 END AS late_count,
+                       CASE WHEN b.return_date > b.due_date THEN 1.0 ELSE 0.0 END AS late_rate,
+                       GREATEST(b.return_date - b.due_date, 0) AS late_days,
+                       COALESCE(f.amount, b.archived_fine, 0) AS fine_amount,
+                       COALESCE(f.paid_amount, b.archived_fine, 0) AS fine_paid_amount
+                  FROM (
+                        SELECT id, borrow_date, return_date, due_date, book_id, member_id, status,
+                               NULL::float AS archived_fine
+                          FROM library_borrow
+                     UNION ALL
+                        SELECT original_id, borrow_date, return_date, due_date, book_id, member_id, 'returned',
+                               fine_amount
+                          FROM library_borrow_archive
+                       ) b
+                  JOIN library_book bk ON bk.id = b.book_id
+             LEFT JOIN (
+                        SELECT library_book_id, min(library_category_id) AS category_id
+                          FROM library_book_library_category_rel
+                      GROUP BY library_book_id
+                       ) cat ON cat.library_book_id = b.book_id
+             LEFT JOIN (
+                        SELECT borrow_id,
+                               sum(amount) AS amount,
+                               sum(amount) FILTER (WHERE status = 'paid') AS paid_amount
+                          FROM library_fine
+                      GROUP BY borrow_id
+                       ) f ON f.borrow_id = b.id
+            )
+            """,
+            SQL.identifier(self._table),
+        ))
+        # unique index required by REFRESH ... CONCURRENTLY, plus the usual
+        # dashboard group-bys
+        self.env.cr.execute(SQL(
+            "CREATE UNIQUE INDEX %s ON %s (id)",
+            SQL.identifier(self._table + "_id_uniq"), SQL.identifier(self._table),
+        ))
+        self.env.cr.execute(SQL(
+            "CREATE INDEX %s ON %s (borrow_date)",
+            SQL.identifier(self._table + "_borrow_date_idx"), SQL.identifier(self._table),
+        ))
+
+    # Scheduled refresh. CONCURRENTLY keeps the report readable while the new
+    # snapshot is built, so it does not block dashboards or the desk
+    @api.model
+    def _cron_refresh(self):
+        self.env.cr.execute(SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY %s", SQL.identifier(self._table)))
+        self.invalidate_model()
@@ -0,0 +1,100 @@
+"""Concurrency check for the copy checkout.
+
+Threads check out the same titles at the same time, one member per thread,
+through /library/circulation/scan on a running server. More members than
+copies compete for every title. Afterwards the script checks that no title
+was oversubscribed (available_copies >= 0 and active loans <= copies) and
+returns the loans it made.
+
+    python scripts/checkout_stress.py --db library --login admin \\
+        --password admin --codes BO001-BO020 \\
+        --members member0@example.com,member1@example.com,member2@example.com
+"""
+import argparse
+import json
+import sys
+import threading
+from collections import Counter
+
+from circulation_load import Client, parse_codes
+
+
+def login(args):
+    client = Client(args.url)
+    client.call("/web/session/authenticate", {
+        "db": args.db, "login": args.login, "password": args.password,
+    })
+    return client
+
+
+def call_kw(client, model, method, args, **kwargs):
+    return client.call("/web/dataset/call_kw", {
+        "model": model, "method": method, "args": args, "kwargs": kwargs,
+    })
+
+
+def worker(args, codes, member, barrier, outcomes, lock):
+    client = login(args)
+    scans = [{"book_code": code, "member": member, "action": "checkout"} for code in codes]
+    barrier.wait()
+    for _i in range(args.rounds):
+        # one scan per request so every checkout races on its own
+        for scan in scans:
+            result = client.call("/library/circulation/scan", {"scans": [scan]})["results"][0]
+            with lock:
+                outcomes[result["status"] == "error" and result["error"] or result["status"]] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8069")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--login", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--members", required=True, help="comma-separated member emails, one thread each")
+    parser.add_argument("--codes", required=True, help="BO001-BO020 or a comma-separated list")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    codes = parse_codes(args.codes)
+    members = args.members.split(",")
+    outcomes = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(members))
+    threads = [
+        threading.Thread(target=worker, args=(args, codes, member, barrier, outcomes, lock))
+        for member in members
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    client = login(args)
+    books = call_kw(
+        client, "library.book", "search_read", [[("book_code", "in", codes)]],
+        fields=["book_code", "copies", "available_copies"],
+    )
+    loans = call_kw(
+        client, "library.borrow", "search_read",
+        [[("book_id.book_code", "in", codes), ("status", "=", "borrowed")]],
+        fields=["book_id", "member_id"],
+    )
+    active = Counter(loan["book_id"][0] for loan in loans)
+    failures = [
+        book["book_code"] for book in books
+        if book["available_copies"] < 0 or active[book["id"]] > book["copies"]
+    ]
+
+    # give the copies back so the script can run again
+    for member in members:
+        client.call("/library/circulation/scan", {"scans": [
+            {"book_code": code, "member": member, "action": "return"} for code in codes
+        ]})
+
+    print(json.dumps({"outcomes": outcomes, "loans": len(loans), "oversubscribed": failures}))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Load test for the /library/circulation/scan endpoint.
+
+Sends batches of scans from several threads against a running server and
+prints the throughput. Each book is checked out then returned, so the
+database is left as it was found.
+
+    python scripts/circulation_load.py --db library --login admin \\
+        --password admin --member member0@example.com --codes BO001-BO500
+"""
+import argparse
+import http.cookiejar
+import json
+import threading
+import time
+import urllib.request
+
+
+def parse_codes(value):
+    if "-" not in value:
+        return value.split(",")
+    first, last = value.split("-")
+    prefix = first.rstrip("0123456789")
+    width = len(first) - len(prefix)
+    return [
+        "%s%0*d" % (prefix, width, number)
+        for number in range(int(first[len(prefix):]), int(last[len(prefix):]) + 1)
+    ]
+
+
+class Client:
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def call(self, path, params):
+        payload = json.dumps({"jsonrpc": "2.0", "method": "call", "params": params}).encode()
+        req = urllib.request.Request(
+            self.url + path, payload, {"Content-Type": "application/json"}
+        )
+        with self.opener.open(req) as response:
+            body = json.load(response)
+        if body.get("error"):
+            raise RuntimeError(body["error"])
+        return body["result"]
+
+
+def worker(args, codes, counters, lock):
+    client = Client(args.url)
+    client.call("/web/session/authenticate", {
+        "db": args.db, "login": args.login, "password": args.password,
+    })
+    for _i in range(args.rounds):
+        for start in range(0, len(codes), args.batch):
+            batch = codes[start:start + args.batch]
+            for action in ("checkout", "return"):
+                scans = [
+                    {"book_code": code, "member": args.member, "action": action}
+                    for code in batch
+                ]
+                results = client.call("/library/circulation/scan", {"scans": scans})["results"]
+                errors = sum(1 for result in results if result["status"] == "error")
+                with lock:
+                    counters["scans"] += len(scans)
+                    counters["errors"] += errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8069")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--login", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--member", required=True, help="member email or phone")
+    parser.add_argument("--codes", required=True, help="BO001-BO500 or a comma-separated list")
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    codes = parse_codes(args.codes)
+    counters = {"scans": 0, "errors": 0}
+    lock = threading.Lock()
+    # each thread works on its own books so threads do not fight over loans
+    threads = [
+        threading.Thread(target=worker, args=(args, codes[i::args.threads], counters, lock))
+        for i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "scans": counters["scans"],
+        "errors": counters["errors"],
+        "seconds": round(elapsed, 3),
+        "scans_per_second": round(counters["scans"] / elapsed, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+from . import test_library_performance
+from . import test_library_hold
+from . import test_overdue_reminders
+from . import test_library_circulation
@@ -0,0 +1,151 @@
+import base64
+import csv
+import io
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged("post_install", "-at_install")
+class TestLibraryCirculation(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Borrow = cls.env["library.borrow"]
+        cls.Fine = cls.env["library.fine"]
+        cls.books = cls.env["library.book"].create([
+            {"name": "Circulation Book %s" % i, "copies": 1} for i in range(3)
+        ])
+        cls.members = cls.env["library.member"].create([
+            {"name": "Reader %s" % i, "phone": "60000000%02d" % i, "email": "reader%s@example.com" % i}
+            for i in range(3)
+        ])
+
+    def _old_returned_borrows(self, member, books, days=1000):
+        return self.Borrow.create([
+            {
+                "member_id": member.id,
+                "book_id": book.id,
+                "borrow_date": fields.Date.today() - timedelta(days=days),
+                "return_date": fields.Date.today() - timedelta(days=days - 5),
+                "status": "returned",
+            }
+            for book in books
+        ])
+
+    def test_scan_batch(self):
+        book, other = self.books[:2]
+        member = self.members[0]
+        results = self.Borrow._process_scans([
+            {"book_code": book.book_code, "member": member.email, "action": "checkout"},
+            {"book_code": "NO-SUCH-CODE", "member": member.email},
+            {"book_code": other.book_code, "member": "nobody@example.com"},
+            "not a scan",
+            {"book_code": book.book_code, "member": member.phone, "action": "checkout"},
+        ])
+        self.assertEqual(
+            [(result["status"], result.get("error")) for result in results],
+            [
+                ("checked_out", None),
+                ("error", "Unknown book code"),
+                ("error", "Unknown member"),
+                ("error", "Invalid scan"),
+                ("error", "You have already borrowed this book."),
+            ],
+        )
+        self.assertEqual(book.available_copies, 0)
+
+        # auto: the member holds the book, so the scan returns it
+        results = self.Borrow._process_scans([{"book_code": book.book_code, "member": member.email}])
+        self.assertEqual(results[0]["status"], "returned")
+        self.assertEqual(book.available_copies, 1)
+
+    def test_enrolment_error_file(self):
+        rows = [
+            {"name": "Ok", "phone": "5000000001", "email": "enrol1@example.com"},
+            {"name": "Numeric Phone", "phone": 5000000002, "email": "enrol2@example.com"},
+            {"name": "Bad Email", "phone": "5000000003", "email": "not-an-email"},
+            {"name": "Duplicate", "phone": "5000000004", "email": "ENROL1@example.com"},
+            {"name": "Existing", "phone": "5000000005", "email": self.members[0].email.upper()},
+            {"name": "Bad Date", "phone": "5000000006", "email": "enrol6@example.com", "membership_date": "2024-13-45"},
+        ]
+        data = "\n".join(json.dumps(row) for row in rows).encode()
+        wizard = self.env["library.member.enrol.wizard"].create({
+            "data_file": base64.b64encode(data),
+            "file_format": "jsonl",
+        })
+        wizard.action_enrol()
+
+        self.assertEqual(wizard.enrolled_count, 2)
+        self.assertEqual(wizard.rejected_count, 4)
+        rejected = list(csv.DictReader(io.StringIO(base64.b64decode(wizard.error_file).decode())))
+        self.assertEqual([row["row"] for row in rejected], ["3", "4", "5", "6"])
+        self.assertEqual(
+            self.env["library.member"].search_count([("email", "in", ["enrol1@example.com", "enrol2@example.com"])]),
+            2,
+        )
+
+    def test_archival_counters(self):
+        book = self.books[0]
+        member = self.members[1]
+        self._old_returned_borrows(member, self.books)
+        # a late return with an unpaid fine is kept in the live table
+        late = self.Borrow.create({
+            "member_id": member.id,
+            "book_id": book.id,
+            "borrow_date": fields.Date.today() - timedelta(days=1000),
+        })
+        late.write({"status": "returned", "return_date": fields.Date.today() - timedelta(days=900)})
+        self.assertEqual(self.Fine.search_count([("borrow_id", "=", late.id), ("status", "=", "unpaid")]), 1)
+
+        self.patch(self.env.cr, "commit", lambda: None)
+        self.env["library.borrow.archive"]._cron_archive_history()
+
+        self.assertEqual(self.env["library.borrow.archive"].search_count([("member_id", "=", member.id)]), 3)
+        self.assertEqual(member.archived_borrow_count, 3)
+        self.assertEqual(member.borrow_count, 1)
+        self.assertEqual(book.archived_borrow_count, 1)
+        self.assertEqual(book.borrow_count, 1)
+        self.assertTrue(late.exists())
+
+    def test_settlement_totals(self):
+        payer, partial = self.members[:2]
+        payer_borrows = self._old_returned_borrows(payer, self.books[:2], days=100)
+        partial_borrow = self._old_returned_borrows(partial, self.books[2:], days=100)
+        self.Fine.create([
+            {"member_id": payer.id, "borrow_id": payer_borrows[0].id, "amount": 10.0},
+            {"member_id": payer.id, "borrow_id": payer_borrows[1].id, "amount": 20.0},
+            {"member_id": partial.id, "borrow_id": partial_borrow.id, "amount": 50.0},
+        ])
+
+        # the payer's two payments land in different chunks and the email
+        # case differs from the member record
+        payments = "member,amount\n%s,10\n%s,20\n%s,20\n" % (payer.email.upper(), partial.email, payer.email)
+        wizard = self.env["library.fine.settlement.wizard"].create({
+            "mode": "reconcile",
+            "payments_file": base64.b64encode(payments.encode()),
+            "file_format": "csv",
+        })
+        with patch("odoo.addons.library_management.wizards.fine_settlement_wizard.RECONCILE_CHUNK_SIZE", 1):
+            wizard.action_settle()
+
+        self.assertEqual(wizard.fine_count, 2)
+        self.assertEqual(wizard.amount_total, 30.0)
+        self.assertEqual(payer.fine_amount_due, 0.0)
+        self.assertFalse(payer.has_unpaid_fines)
+        self.assertEqual(partial.fine_amount_due, 50.0)
+        self.assertIn("paid 20.00 of 50.00 due", wizard.summary)
+
+    def test_settle_members(self):
+        member = self.members[2]
+        borrows = self._old_returned_borrows(member, self.books[:2], days=100)
+        self.Fine.create([
+            {"member_id": member.id, "borrow_id": borrow.id, "amount": 15.0} for borrow in borrows
+        ])
+        totals = self.Fine._settle_members(member)
+        self.assertEqual(totals, {member: (2, 30.0)})
+        self.assertEqual(member.fine_amount_due, 0.0)
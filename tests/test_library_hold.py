@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from psycopg2 import IntegrityError
+
+from odoo import fields
+from odoo.exceptions import ValidationError
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import mute_logger
+
+
+@tagged("post_install", "-at_install")
+class TestLibraryHold(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.book = cls.env["library.book"].create({"name": "Hold Book", "copies": 1})
+        cls.reader, cls.first, cls.second = cls.env["library.member"].create([
+            {"name": "Member %s" % i, "phone": "80000000%02d" % i, "email": "hold%s@example.com" % i}
+            for i in range(3)
+        ])
+        cls.loan = cls.env["library.borrow"].create({"member_id": cls.reader.id, "book_id": cls.book.id})
+        cls.first_hold, cls.second_hold = cls.env["library.hold"].create([
+            {"book_id": cls.book.id, "member_id": cls.first.id},
+            {"book_id": cls.book.id, "member_id": cls.second.id},
+        ])
+
+    def _return_loan(self):
+        self.loan.write({"status": "returned", "return_date": fields.Date.today()})
+
+    def test_queue_positions(self):
+        self.assertEqual(self.first_hold.position + 1, self.second_hold.position)
+        self.assertEqual(self.book.available_copies, 0)
+
+    def test_return_goes_to_head_of_queue(self):
+        self._return_loan()
+
+        self.assertEqual(self.first_hold.state, "ready")
+        self.assertEqual(self.second_hold.state, "waiting")
+        # the copy is kept for the hold, not put back on the shelf
+        self.assertEqual(self.book.available_copies, 0)
+        with self.assertRaises(ValidationError):
+            self.env["library.borrow"].create({"member_id": self.second.id, "book_id": self.book.id})
+
+        # picking it up does not take a second copy
+        self.env["library.borrow"].create({"member_id": self.first.id, "book_id": self.book.id})
+        self.assertEqual(self.first_hold.state, "fulfilled")
+        self.assertEqual(self.book.available_copies, 0)
+
+    def test_expiry_passes_copy_to_next_member(self):
+        self._return_loan()
+        self.first_hold.expiry_date = fields.Date.today() - timedelta(days=1)
+
+        self.patch(self.env.cr, "commit", lambda: None)
+        self.env["library.hold"]._cron_expire_holds()
+
+        self.assertEqual(self.first_hold.state, "expired")
+        self.assertEqual(self.second_hold.state, "ready")
+        self.assertEqual(self.book.available_copies, 0)
+
+    def test_added_copies_go_to_queue(self):
+        self.book.copies = 3
+
+        # two new copies: one per waiting member, none left on the shelf
+        self.assertEqual(self.first_hold.state, "ready")
+        self.assertEqual(self.second_hold.state, "ready")
+        self.assertEqual(self.book.available_copies, 0)
+
+        self.book.copies = 4
+        self.assertEqual(self.book.available_copies, 1)
+
+    def test_hold_on_available_book(self):
+        book = self.env["library.book"].create({"name": "Shelf Book", "copies": 1})
+        with self.assertRaises(ValidationError):
+            self.env["library.hold"].create({"book_id": book.id, "member_id": self.first.id})
+
+    @mute_logger("odoo.sql_db")
+    def test_hold_without_book(self):
+        with self.assertRaises((ValidationError, IntegrityError)), self.env.cr.savepoint():
+            self.env["library.hold"].create({"member_id": self.first.id})
@@ -0,0 +1,184 @@
+import json
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from odoo import fields
+from odoo.models import PREFETCH_MAX
+from odoo.tests import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+# Scales to seed, e.g. LIBRARY_PERF_SCALES=1000,10000,100000
+SCALES = [int(scale) for scale in os.environ.get("LIBRARY_PERF_SCALES", "1000").split(",")]
+# Optional path of the JSON report, one entry per measured operation
+REPORT_PATH = os.environ.get("LIBRARY_PERF_REPORT")
+
+# Query budgets per operation: (fixed queries, queries per prefetch batch).
+# Field reads and recomputations are split in chunks of PREFETCH_MAX
+# records, so a batch of n records may use
+# fixed + per_batch * ceil(n / PREFETCH_MAX) queries and no more, whatever
+# the scale. A per-record regression breaks the budget at any scale.
+# Operations without a budget (the per-record sequence baseline) are only
+# timed
+QUERY_BUDGETS = {
+    "checkout": (30, 6),
+    "return": (35, 8),
+    "fine_payment": (20, 4),
+    "book_list_read": (2, 3),
+    "member_list_read": (1, 1),
+    "check_unpaid_fines": (2, 1),
+    "check_email": (1, 1),
+    "book_code_block": (3, 0),
+}
+
+
+@tagged("post_install", "-at_install", "performance")
+class TestLibraryPerformance(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        _logger.info("library performance results: %s", json.dumps(cls.results))
+        if REPORT_PATH:
+            with open(REPORT_PATH, "w") as report:
+                json.dump(cls.results, report, indent=2)
+        super().tearDownClass()
+
+    def _budget(self, operation, size):
+        if operation not in QUERY_BUDGETS:
+            return None
+        fixed, per_batch = QUERY_BUDGETS[operation]
+        return fixed + per_batch * math.ceil(size / PREFETCH_MAX)
+
+    # Runs the operation under assertQueryCount with its budget and records
+    # the timings and query count in the JSON report
+    @contextmanager
+    def _measure(self, operation, size):
+        self.env.flush_all()
+        self.env.invalidate_all()
+        entry = {"operation": operation, "size": size, "budget": self._budget(operation, size)}
+        self.results.append(entry)
+        queries = self.cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            if entry["budget"] is None:
+                yield entry
+            else:
+                with self.assertQueryCount(entry["budget"]):
+                    yield entry
+        finally:
+            entry["seconds"] = round(time.perf_counter() - start, 4)
+            entry["queries"] = self.cr.sql_log_count - queries
+
+    def _seed(self, size, prefix):
+        members = self.env["library.member"].create([
+            {
+                "name": "Member %s" % i,
+                "phone": "9%09d" % i,
+                "email": "%s%s@example.com" % (prefix, i),
+            }
+            for i in range(size)
+        ])
+        books = self.env["library.book"].create([
+            {"name": "%s Book %s" % (prefix, i), "copies": 2}
+            for i in range(size)
+        ])
+        return members, books
+
+    def _borrow_vals(self, members, books, borrow_date=None):
+        return [
+            {
+                "member_id": member.id,
+                "book_id": book.id,
+                "borrow_date": borrow_date or fields.Date.today(),
+            }
+            for member, book in zip(members, books)
+        ]
+
+    def test_checkout(self):
+        for scale in SCALES:
+            members, books = self._seed(scale + 10, "checkout%s" % scale)
+            Borrow = self.env["library.borrow"]
+
+            with self._measure("checkout", 10):
+                Borrow.create(self._borrow_vals(members[:10], books[:10]))
+            with self._measure("checkout", scale):
+                borrows = Borrow.create(self._borrow_vals(members[10:], books[10:]))
+
+            self.assertEqual(set(borrows.book_id.mapped("available_copies")), {1})
+
+    def test_return(self):
+        for scale in sorted(set(SCALES) | {1000, 10000}):
+            members, books = self._seed(scale + 10, "return%s" % scale)
+            borrow_date = fields.Date.today() - timedelta(days=30)
+            borrows = self.env["library.borrow"].create(
+                self._borrow_vals(members, books, borrow_date)
+            )
+            vals = {"status": "returned", "return_date": fields.Date.today()}
+
+            with self._measure("return", 10):
+                borrows[:10].write(vals)
+            with self._measure("return", scale):
+                borrows[10:].write(vals)
+
+            self.assertEqual(
+                self.env["library.fine"].search_count([("borrow_id", "in", borrows.ids)]),
+                scale + 10,
+            )
+            self.assertEqual(set(books.mapped("available_copies")), {2})
+
+    def test_fine_payment(self):
+        for scale in SCALES:
+            members, books = self._seed(scale + 10, "payment%s" % scale)
+            borrows = self.env["library.borrow"].create(
+                self._borrow_vals(members, books, fields.Date.today() - timedelta(days=30))
+            )
+            borrows.write({"status": "returned", "return_date": fields.Date.today()})
+            fines = self.env["library.fine"].search([("borrow_id", "in", borrows.ids)])
+
+            with self._measure("fine_payment", 10):
+                fines[:10].write({"status": "paid"})
+            with self._measure("fine_payment", scale):
+                fines[10:].write({"status": "paid"})
+
+            self.assertFalse(any(fines.mapped("active")))
+
+    def test_list_view_reads(self):
+        for scale in SCALES:
+            members, books = self._seed(scale, "list%s" % scale)
+            self.env["library.borrow"].create(self._borrow_vals(members, books))
+
+            # Stored counters: reading them never loads the child rows
+            with self._measure("book_list_read", scale):
+                books.read(["book_code", "name", "author_id", "available", "category_id", "borrow_count"])
+            with self._measure("member_list_read", scale):
+                members.read(["name", "phone", "email", "borrow_count", "fine_amount_due"])
+
+    def test_constraints(self):
+        for scale in SCALES:
+            members, books = self._seed(scale, "constraint%s" % scale)
+            borrows = self.env["library.borrow"].create(self._borrow_vals(members, books))
+
+            with self._measure("check_unpaid_fines", scale):
+                borrows._check_unpaid_fines()
+            with self._measure("check_email", scale):
+                members._check_email()
+
+    def test_book_code_allocation(self):
+        Book = self.env["library.book"]
+        Sequence = self.env["ir.sequence"]
+        for scale in SCALES:
+            with self._measure("book_code_per_record", scale):
+                per_record = [Sequence.next_by_code("library.book") for _i in range(scale)]
+            with self._measure("book_code_block", scale):
+                codes = Book._allocate_book_codes(scale)
+
+            self.assertEqual(len(set(codes) | set(per_record)), 2 * scale)
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.addons.mail.tests.common import MailCommon
+from odoo.tests import tagged
+
+
+@tagged("post_install", "-at_install")
+class TestOverdueReminders(MailCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env["ir.config_parameter"].sudo().set_param("library_management.reminder_rate", 2)
+        members = cls.env["library.member"].create([
+            {"name": "Late %s" % i, "phone": "70000000%02d" % i, "email": "late%s@example.com" % i}
+            for i in range(5)
+        ])
+        books = cls.env["library.book"].create([{"name": "Late Book %s" % i} for i in range(5)])
+        cls.borrows = cls.env["library.borrow"].create([
+            {
+                "member_id": member.id,
+                "book_id": book.id,
+                "borrow_date": fields.Date.today() - timedelta(days=30),
+            }
+            for member, book in zip(members, books)
+        ])
+
+    def _queue(self):
+        self.patch(self.env.cr, "commit", lambda: None)
+        self.env["library.borrow"]._cron_queue_overdue_reminders()
+        return self.env["mail.mail"].search(
+            [("library_reminder", "=", True), ("res_id", "in", self.borrows.ids)], order="scheduled_date, id",
+        )
+
+    def test_reminders_queued_and_sent(self):
+        mails = self._queue()
+
+        self.assertEqual(len(mails), 5)
+        self.assertEqual(set(mails.mapped("email_to")), set(self.borrows.member_id.mapped("email")))
+        for mail in mails:
+            self.assertNotIn("{{", mail.email_from)
+            self.assertIn("@", mail.email_from)
+        self.assertEqual(set(self.borrows.mapped("reminder_date")), {fields.Date.today()})
+
+        # reminder_rate = 2: two mails per minute
+        first = mails[0].scheduled_date
+        self.assertEqual(
+            [mail.scheduled_date - first for mail in mails],
+            [timedelta(minutes=i // 2) for i in range(5)],
+        )
+
+        # a second run within the interval queues nothing
+        self.assertEqual(self._queue(), mails)
+
+        senders = set(mails.mapped("email_from"))
+        mails.scheduled_date = fields.Datetime.now() - timedelta(minutes=1)
+        with self.mock_mail_gateway():
+            self.env["mail.mail"].process_email_queue(ids=mails.ids)
+        self.assertEqual(len(self._mails), 5)
+        self.assertEqual({mail["email_from"] for mail in self._mails}, senders)
+
+    def test_failed_reminders_are_retried(self):
+        mail = self._queue()[0]
+        mail.write({"state": "exception", "failure_reason": "SMTP down"})
+
+        self.env["mail.mail"]._cron_retry_library_reminders()
+        self.assertEqual(mail.state, "outgoing")
+        self.assertEqual(mail.library_retry_count, 1)
+        self.assertGreater(mail.scheduled_date, fields.Datetime.now())
+
+        # gives up after REMINDER_MAX_RETRIES attempts
+        mail.write({"state": "exception", "library_retry_count": 3})
+        self.env["mail.mail"]._cron_retry_library_reminders()
+        self.assertEqual(mail.state, "exception")
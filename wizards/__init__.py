@@ -1 +1,4 @@
-from . import force_stop_borrow_wizard
\ No newline at end of file
+from . import force_stop_borrow_wizard
+from . import force_stop_borrow_bulk_wizard
+from . import fine_settlement_wizard
+from . import member_enrol_wizard
@@ -0,0 +1,129 @@
+from itertools import islice
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+# Payment rows matched per chunk
+RECONCILE_CHUNK_SIZE = 1000
+
+
+class FineSettlementWizard(models.TransientModel):
+    _name = "library.fine.settlement.wizard"
+    _inherit = ["library.stream.mixin"]
+    _description = "Fine Settlement Wizard"
+
+    mode = fields.Selection(
+        [
+            ("members", "Settle Members"),
+            ("reconcile", "Reconcile Payments File"),
+        ],
+        string="Mode",
+        default="members",
+        required=True,
+    )
+    member_ids = fields.Many2many("library.member", string="Members")
+    payments_file = fields.Binary(string="Payments File", attachment=True)
+    file_format = fields.Selection(
+        [
+            ("csv", "CSV"),
+            ("jsonl", "JSON Lines"),
+        ],
+        string="Format",
+        default="csv",
+    )
+
+    state = fields.Selection([("draft", "Draft"), ("done", "Done")], default="draft")
+    fine_count = fields.Integer(string="Fines Paid", readonly=True)
+    amount_total = fields.Float(string="Amount Settled", readonly=True)
+    summary = fields.Text(string="Summary", readonly=True)
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if self.env.context.get("active_model") == "library.member" and self.env.context.get("active_ids"):
+            res["member_ids"] = [fields.Command.set(self.env.context["active_ids"])]
+        return res
+
+    def action_settle(self):
+        self.ensure_one()
+        if self.mode == "members":
+            if not self.member_ids:
+                raise UserError("Select the members to settle.")
+            lines = self._format_totals(self.env["library.fine"]._settle_members(self.member_ids))
+        else:
+            if not self.payments_file:
+                raise UserError("Upload the payments file to reconcile.")
+            lines = self._reconcile()
+
+        self.state = "done"
+        self.summary = "\n".join(lines)
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def _format_totals(self, totals):
+        lines = []
+        for member, (count, amount) in totals.items():
+            self.fine_count += count
+            self.amount_total += amount
+            lines.append("%s: %s fine(s), %.2f" % (member.display_name, count, amount))
+        return lines
+
+    # Streams the payments file (columns: member as email or phone, amount)
+    # and sums the payments per member over the whole file, members being
+    # resolved chunk by chunk. Members whose payments cover their whole
+    # outstanding balance are then settled; other rows are listed in the
+    # summary
+    def _reconcile(self):
+        Member = self.env["library.member"]
+        Fine = self.env["library.fine"]
+        lines = []
+        unmatched = []
+        paid = {}
+        with self._open_binary_stream("payments_file") as stream:
+            rows = self._iter_file_rows(stream, self.file_format)
+            line_no = 0
+            while True:
+                chunk = list(islice(rows, RECONCILE_CHUNK_SIZE))
+                if not chunk:
+                    break
+
+                idents = {str(row.get("member") or "").strip() for row in chunk}
+                members = self.env["library.member"]._find_members(idents)
+                for row in chunk:
+                    line_no += 1
+                    ident = str(row.get("member") or "").strip()
+                    member_id = members.get(ident.lower()) or members.get(ident)
+                    if not member_id:
+                        unmatched.append("Line %s: unknown member" % line_no)
+                        continue
+                    try:
+                        amount = float(row.get("amount") or 0.0)
+                    except ValueError:
+                        unmatched.append("Line %s: invalid amount" % line_no)
+                        continue
+                    paid[member_id] = paid.get(member_id, 0.0) + amount
+
+        member_ids = sorted(paid)
+        for start in range(0, len(member_ids), RECONCILE_CHUNK_SIZE):
+            to_settle = []
+            batch = Member.browse(member_ids[start:start + RECONCILE_CHUNK_SIZE])
+            for member in batch:
+                amount = paid[member.id]
+                if not member.fine_amount_due:
+                    unmatched.append("%s: nothing due" % member.display_name)
+                elif amount < member.fine_amount_due:
+                    unmatched.append("%s: paid %.2f of %.2f due" % (
+                        member.display_name, amount, member.fine_amount_due,
+                    ))
+                else:
+                    to_settle.append(member.id)
+            lines += self._format_totals(Fine._settle_members(Member.browse(to_settle)))
+
+        if unmatched:
+            lines += ["", "Not matched:"] + unmatched
+        return lines
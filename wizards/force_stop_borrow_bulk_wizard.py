@@ -0,0 +1,67 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools.safe_eval import safe_eval
+
+
+class ForceStopBorrowBulkWizard(models.TransientModel):
+    _name = "force.stop.borrow.bulk.wizard"
+    _description = "Force Close Borrows Wizard"
+
+    borrow_ids = fields.Many2many("library.borrow", string="Borrow Records")
+    # used instead of borrow_ids for selections too large to send as ids
+    domain = fields.Char(string="Domain")
+    return_date = fields.Date(string="Return Date", default=fields.Date.context_today, required=True)
+    borrow_count = fields.Integer(string="Selected Borrows", compute="_compute_borrow_count")
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        context = self.env.context
+        if context.get("active_model") != "library.borrow":
+            return res
+
+        # "Select all" sends at most web.active_ids_limit ids; beyond that the
+        # list domain is used so the whole selection gets closed
+        active_ids = context.get("active_ids") or []
+        ids_limit = int(self.env["ir.config_parameter"].sudo().get_param("web.active_ids_limit", 20000))
+        if context.get("active_domain") is not None and len(active_ids) >= ids_limit:
+            res["domain"] = repr(context["active_domain"])
+        elif active_ids:
+            res["borrow_ids"] = [fields.Command.set(active_ids)]
+        return res
+
+    @api.depends("borrow_ids", "domain")
+    def _compute_borrow_count(self):
+        for wizard in self:
+            wizard.borrow_count = self.env["library.borrow"].search_count(wizard._get_domain())
+
+    def _get_domain(self):
+        if self.domain:
+            return safe_eval(self.domain)
+        return [("id", "in", self.borrow_ids.ids)]
+
+    # Hands the close-out to a background job committed per chunk, so a large
+    # selection neither holds the request nor runs as one transaction. The
+    # job form shows the progress and the summary counters
+    def action_force_close(self):
+        self.ensure_one()
+        Borrow = self.env["library.borrow"]
+        domain = self._get_domain()
+
+        total = Borrow.search_count(domain)
+        if not total:
+            raise UserError("No borrow record selected.")
+        job = self.env["library.borrow.close.job"].create({
+            "borrow_ids": [fields.Command.set(self.borrow_ids.ids)],
+            "domain": self.domain,
+            "return_date": self.return_date,
+            "borrow_total": total,
+            "returned_count": Borrow.search_count(domain + [("status", "=", "returned")]),
+        })
+        job.action_queue()
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": job._name,
+            "res_id": job.id,
+            "view_mode": "form",
+        }
@@ -0,0 +1,79 @@
+import base64
+import csv
+import io
+from itertools import islice
+
+from odoo import models, fields
+from odoo.exceptions import UserError
+
+# Rows validated and created per chunk
+ENROL_CHUNK_SIZE = 1000
+
+
+class MemberEnrolWizard(models.TransientModel):
+    _name = "library.member.enrol.wizard"
+    _inherit = ["library.stream.mixin"]
+    _description = "Member Bulk Enrolment Wizard"
+
+    data_file = fields.Binary(string="File", attachment=True, required=True)
+    file_format = fields.Selection(
+        [
+            ("csv", "CSV"),
+            ("jsonl", "JSON Lines"),
+        ],
+        string="Format",
+        default="csv",
+        required=True,
+    )
+
+    state = fields.Selection([("draft", "Draft"), ("done", "Done")], default="draft")
+    enrolled_count = fields.Integer(string="Enrolled", readonly=True)
+    rejected_count = fields.Integer(string="Rejected", readonly=True)
+    error_file = fields.Binary(string="Rejected Rows", readonly=True, attachment=False)
+    error_filename = fields.Char(default="rejected_members.csv")
+
+    # Streams the file (columns: name, phone, email, membership_date) and
+    # enrols it chunk by chunk. Invalid and duplicate rows are skipped and
+    # reported in a CSV error file
+    def action_enrol(self):
+        self.ensure_one()
+        Member = self.env["library.member"]
+        enrolled = 0
+        errors = []
+        with self._open_binary_stream("data_file") as stream:
+            rows = self._iter_file_rows(stream, self.file_format)
+            first_row = 1
+            while True:
+                chunk = list(islice(rows, ENROL_CHUNK_SIZE))
+                if not chunk:
+                    break
+                members, chunk_errors = Member._enroll(chunk, first_row)
+                enrolled += len(members)
+                errors += chunk_errors
+                first_row += len(chunk)
+                self.env.flush_all()
+                self.env.invalidate_all()
+
+        if not enrolled and not errors:
+            raise UserError("The file is empty.")
+
+        values = {
+            "state": "done",
+            "enrolled_count": enrolled,
+            "rejected_count": len(errors),
+            "error_file": False,
+        }
+        if errors:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=["row", "email", "error"])
+            writer.writeheader()
+            writer.writerows(errors)
+            values["error_file"] = base64.b64encode(buffer.getvalue().encode())
+        self.write(values)
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }